@@ -1,5 +1,10 @@
 import frappe
-from frappe.utils import add_days, nowdate
+from frappe.utils import add_days, cint, nowdate
+
+from saas_platform.provisioning import get_pipeline_timeout
+from saas_platform.utils import outbox, query_cost, tenant_token, usage
+
+
 @frappe.whitelist(allow_guest=True)
 def register_user(email, company, password, subdomain):
     # 1. Create Tenant Doc
@@ -14,6 +19,60 @@ def register_user(email, company, password, subdomain):
     tenant.insert(ignore_permissions=True)
 
     # 2. Enqueue Background Job
-    frappe.enqueue('saas_platform.tasks.provision_site', tenant=tenant.name, password=password)
+    frappe.enqueue('saas_platform.tasks.provision_site', queue='long',
+                   timeout=get_pipeline_timeout(), enqueue_after_commit=True,
+                   tenant=tenant.name, password=password)
 
     return {"success": True}
+
+
+@frappe.whitelist(allow_guest=True)
+def get_tenant_token_keys():
+    """Public key(s) microservices use to verify tenant context tokens"""
+    return tenant_token.get_public_jwks()
+
+
+@frappe.whitelist()
+def get_tenant_token():
+    """Fresh tenant context token for the logged-in user"""
+    if frappe.session.user == "Guest":
+        frappe.throw("Login required", frappe.AuthenticationError)
+
+    return {"token": tenant_token.issue_token(frappe.session.user),
+            "expires_in": tenant_token.get_token_ttl()}
+
+
+@frappe.whitelist(methods=["POST"])
+def resolve_sessions(sids):
+    """Batch server-side session validation for microservices"""
+    frappe.only_for("System Manager")
+
+    sids = frappe.parse_json(sids)
+    if len(sids) > 500:
+        frappe.throw("At most 500 sessions per call")
+
+    return tenant_token.resolve_sessions(sids)
+
+
+@frappe.whitelist()
+def get_tenant_changes(after=0, limit=500):
+    """Cursor-based pull of tenant / membership change events"""
+    frappe.only_for("System Manager")
+
+    return outbox.get_events(after, limit)
+
+
+@frappe.whitelist()
+def get_tenant_db_usage(minutes=60, by_doctype=0):
+    """Per-tenant DB time, query and rows returned / affected totals over the last `minutes`"""
+    frappe.only_for("System Manager")
+
+    return query_cost.get_usage(minutes, by_doctype=cint(by_doctype))
+
+
+@frappe.whitelist()
+def get_tenant_usage(tenant_id):
+    """Users, documents and file storage of a tenant (for billing)"""
+    frappe.only_for("System Manager")
+
+    return usage.get_tenant_usage(tenant_id)
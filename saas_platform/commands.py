@@ -0,0 +1,29 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("export-tenant")
+@click.argument("tenant")
+@click.option("--format", "fmt", type=click.Choice(["ndjson", "sql"]), default="ndjson",
+              help="Output format (gzip compressed)")
+@click.option("--output-dir", help="Target folder, defaults to sites/<site>/private/exports")
+@click.option("--workers", type=int, help="Tables exported in parallel")
+@pass_context
+def export_tenant(context, tenant, fmt, output_dir=None, workers=None):
+    """Export all rows of one tenant from the shared database"""
+    from saas_platform.utils.tenant_export import export_tenant
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        manifest = export_tenant(tenant, fmt=fmt, output_dir=output_dir, max_workers=workers)
+    finally:
+        frappe.destroy()
+
+    if manifest["errors"]:
+        raise SystemExit(1)
+
+
+commands = [export_tenant]
@@ -97,7 +97,10 @@ app_license = "mit"
 # Name of the app being installed is passed as an argument
 
 # before_app_install = "saas_platform.utils.before_app_install"
-after_install = "saas_platform.utils.tenant.setup_user_tenant"
+after_install = [
+    "saas_platform.utils.tenant.setup_user_tenant",
+    "saas_platform.utils.tenant_token.ensure_signing_key",
+]
 after_app_install = "saas_platform.patches.add_tenant_id_to_all_tables.execute"
 # Also ensure setup runs after app install to catch any missed initialization
 after_app_install = [
@@ -148,9 +151,34 @@ after_app_install = [
 doc_events = {
     "*": {
         "before_insert": "saas_platform.utils.set_tenant_id",
-    }
+        # Buffered per-tenant usage counters
+        "after_insert": "saas_platform.utils.usage.on_insert",
+        "on_trash": "saas_platform.utils.usage.on_trash",
+    },
+    # Rebuild cached tenant stamping plans when meta changes
+    "DocType": {
+        "on_update": "saas_platform.utils.stamping.on_doctype_update",
+    },
+    "Custom Field": {
+        "on_update": "saas_platform.utils.stamping.on_custom_field_change",
+        "on_trash": "saas_platform.utils.stamping.on_custom_field_change",
+    },
+    # Keep the shared User -> tenant_id cache in sync
+    "User": {
+        "on_update": [
+            "saas_platform.utils.tenant_resolver.on_user_update",
+            "saas_platform.utils.tenant_session.on_user_update",
+        ],
+        "on_trash": "saas_platform.utils.tenant_resolver.on_user_trash",
+    },
 }
 
+# Drop cached tenant stamping plans and statuses on `bench clear-cache` / migrate
+clear_cache = [
+    "saas_platform.utils.stamping.clear_stamping_plan",
+    "saas_platform.utils.tenant_status.clear_tenant_status",
+]
+
 # Post-login hook to set tenant_id in session
 on_session_creation = "saas_platform.utils.tenant.on_session_creation"
 
@@ -162,23 +190,28 @@ permission_query_conditions = {
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"saas_platform.tasks.all"
-# 	],
-# 	"daily": [
-# 		"saas_platform.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"saas_platform.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"saas_platform.tasks.weekly"
-# 	],
-# 	"monthly": [
-# 		"saas_platform.tasks.monthly"
-# 	],
-# }
+scheduler_events = {
+    "all": [
+        # Keep pre-installed spare sites ready for instant provisioning
+        "saas_platform.site_pool.refill_pool",
+        # Start provisions that were queued behind the concurrency cap
+        "saas_platform.provisioning.process_provisioning_queue",
+        # Apply buffered usage counter increments
+        "saas_platform.utils.usage.flush_usage_buffer",
+    ],
+    "hourly": [
+        # Resume tenant purges that were interrupted
+        "saas_platform.utils.tenant_purge.resume_purges",
+    ],
+    "daily": [
+        "saas_platform.tasks.suspend_expired_trials",
+        "saas_platform.tasks.send_trial_warning_emails",
+    ],
+    "daily_long": [
+        # Recount usage to correct drift from raw SQL writes
+        "saas_platform.utils.usage.reconcile_usage",
+    ],
+}
 
 # Testing
 # -------
@@ -210,13 +243,24 @@ permission_query_conditions = {
 
 # Request Events
 # ----------------
-# before_request = ["saas_platform.utils.before_request"]
-# after_request = ["saas_platform.utils.after_request"]
+# Host -> tenant routing (before authentication), per-tenant query cost
+# (opt-in via saas_query_cost_enabled), the suspended tenant gate and
+# API rate limits / concurrency quotas (see auth_hooks too)
+before_request = [
+    "saas_platform.utils.tenant_routing.set_request_tenant",
+    "saas_platform.utils.query_cost.start_recording",
+    "saas_platform.utils.tenant_status.enforce_tenant_status",
+    "saas_platform.utils.rate_limit.enforce_tenant_rate_limit",
+]
+after_request = [
+    "saas_platform.utils.rate_limit.after_request",
+    "saas_platform.utils.query_cost.stop_recording",
+]
 
 # Job Events
 # ----------
-# before_job = ["saas_platform.utils.before_job"]
-# after_job = ["saas_platform.utils.after_job"]
+before_job = ["saas_platform.utils.query_cost.start_recording"]
+after_job = ["saas_platform.utils.query_cost.stop_recording"]
 
 # User Data Protection
 # --------------------
@@ -245,16 +289,19 @@ permission_query_conditions = {
 # Authentication and authorization
 # --------------------------------
 
-# auth_hooks = [
-# 	"saas_platform.auth.validate"
-# ]
+# Token / API key requests are only authenticated after before_request
+auth_hooks = [
+    "saas_platform.utils.tenant_status.enforce_tenant_status",
+    "saas_platform.utils.rate_limit.enforce_tenant_rate_limit",
+]
 
 # Automatically update python controller files with type annotations for this app.
 # export_python_type_annotations = True
 
-# default_log_clearing_doctypes = {
-# 	"Logging DocType Name": 30  # days to retain logs
-# }
+default_log_clearing_doctypes = {
+    # Outbox consumers further behind than this need a full resync
+    "Tenant Change Event": 30
+}
 
 
 website_route_rules = [
@@ -4,6 +4,11 @@ Tenant ID Migration Patch for saas_platform
 Adds tenant_id column to ALL DocTypes using ALTER TABLE for performance.
 This is a Frappe patch that runs during migration (bench migrate).
 
+Column and index are added in one online ALTER per table, tables are
+processed largest first on a bounded worker pool (site_config
+`saas_migration_workers`), and an interrupted run resumes from its
+checkpoint. See saas_platform/utils/tenant_migration.py.
+
 Usage:
     Add to patches.txt:
     saas_platform.patches.add_tenant_id_to_all_tables.execute
@@ -11,6 +16,12 @@ Usage:
 
 import frappe
 
+from saas_platform.utils.tenant_migration import (
+    COLUMN_DEFINITION,
+    alter_table_online,
+    migrate_tenant_columns,
+)
+
 
 def execute():
     """Main patch execution - called by bench migrate"""
@@ -18,54 +29,28 @@ def execute():
     print("TENANT ID MIGRATION PATCH")
     print("=" * 70)
 
-    # Get all DocTypes (including child tables)
-    all_doctypes = frappe.get_all('DocType',
-                                  # Exclude single DocTypes
-                                  filters={'issingle': 0},
-                                  fields=['name', 'istable'],
-                                  order_by='name'
-                                  )
-
-    print(f"\n📋 Found {len(all_doctypes)} DocTypes to process")
-    print(
-        f"   (Including {sum(1 for dt in all_doctypes if dt.istable)} child tables)\n")
-
-    success_count = 0
-    skip_count = 0
-    error_count = 0
-
-    for doctype_info in all_doctypes:
-        doctype_name = doctype_info.name
-        try:
-            result = add_tenant_id_column(doctype_name)
-            if result == "added":
-                success_count += 1
-            elif result == "exists":
-                skip_count += 1
-        except Exception as e:
-            print(f"\n❌ Error processing {doctype_name}: {str(e)}")
-            error_count += 1
+    result = migrate_tenant_columns()
 
     # Summary
     print("\n" + "=" * 70)
     print("MIGRATION SUMMARY")
     print("=" * 70)
-    print(f"✅ Added: {success_count}")
-    print(f"⏭️  Skipped (already exists): {skip_count}")
-    print(f"❌ Errors: {error_count}")
-    print(f"📊 Total: {len(all_doctypes)}")
+    print(f"✅ Added: {len(result['added'])}")
+    print(f"⏭️  Skipped (already exists): {len(result['skipped'])}")
+    print(f"❌ Errors: {len(result['errors'])}")
     print("=" * 70)
 
-    if error_count > 0:
+    if result["errors"]:
         frappe.log_error(
-            "Tenant ID migration completed with errors", "Tenant Migration")
+            "Tenant ID migration completed with errors (re-run to resume)",
+            "Tenant Migration")
 
     frappe.db.commit()
 
 
 def add_tenant_id_column(doctype_name):
     """
-    Add tenant_id column using ALTER TABLE
+    Add tenant_id column and index to a single DocType table
 
     Returns:
         'added' if column was added
@@ -83,22 +68,11 @@ def add_tenant_id_column(doctype_name):
 
     print(f"   ➕ Adding tenant_id to {doctype_name}...")
 
-    # Add column with ALTER TABLE
-    frappe.db.sql(f"""
-        ALTER TABLE `{table_name}` 
-        ADD COLUMN tenant_id VARCHAR(140) DEFAULT 'SYSTEM'
-    """)
-
-    # Add index for performance
-    try:
-        index_name = f"{table_name}_tenant_id_index"
-        frappe.db.sql(f"""
-            ALTER TABLE `{table_name}` 
-            ADD INDEX `{index_name}` (tenant_id)
-        """)
-    except Exception as e:
-        # Index might already exist, that's okay
-        pass
+    # Column and index in one online ALTER so the table is rebuilt once
+    alter_table_online(table_name, [
+        f"ADD COLUMN {COLUMN_DEFINITION}",
+        f"ADD INDEX `{table_name}_tenant_id_index` (tenant_id)",
+    ])
 
     return "added"
 
@@ -0,0 +1,84 @@
+"""
+Backfill NULL tenant_id values to SYSTEM and make the column NOT NULL
+
+Rows inserted before the tenant_id column had a default (or written
+explicitly with NULL) would otherwise need an `OR tenant_id IS NULL`
+branch in every permission query, which defeats the tenant_id index.
+
+Usage:
+    Add to patches.txt (after add_tenant_id_to_all_tables):
+    saas_platform.patches.backfill_null_tenant_id.execute
+"""
+
+import frappe
+
+BATCH_SIZE = 10000
+
+
+def execute():
+    """Main patch execution - called by bench migrate"""
+    tables = get_nullable_tenant_tables()
+
+    print(f"\n📋 Found {len(tables)} tables with a nullable tenant_id column")
+
+    error_count = 0
+    for table_name in tables:
+        try:
+            updated = backfill_table(table_name)
+            frappe.db.sql_ddl(f"""
+                ALTER TABLE `{table_name}`
+                MODIFY tenant_id VARCHAR(140) NOT NULL DEFAULT 'SYSTEM'
+            """)
+            if updated:
+                print(f"   ✅ {table_name}: {updated} rows set to SYSTEM")
+        except Exception as e:
+            print(f"\n❌ Error processing {table_name}: {str(e)}")
+            error_count += 1
+
+    if error_count > 0:
+        frappe.log_error(
+            "tenant_id backfill completed with errors", "Tenant Migration")
+
+
+def get_nullable_tenant_tables():
+    """
+    Tables whose tenant_id column still allows NULL
+
+    Columns covered by a unique index (e.g. Tenant.tenant_id) are left
+    alone, backfilling them to a single value would violate the index.
+    """
+    return frappe.db.sql_list("""
+        SELECT c.TABLE_NAME
+        FROM information_schema.COLUMNS c
+        WHERE c.TABLE_SCHEMA = DATABASE()
+            AND c.COLUMN_NAME = 'tenant_id'
+            AND c.IS_NULLABLE = 'YES'
+            AND NOT EXISTS (
+                SELECT 1 FROM information_schema.STATISTICS s
+                WHERE s.TABLE_SCHEMA = c.TABLE_SCHEMA
+                    AND s.TABLE_NAME = c.TABLE_NAME
+                    AND s.COLUMN_NAME = 'tenant_id'
+                    AND s.NON_UNIQUE = 0
+            )
+        ORDER BY c.TABLE_NAME
+    """)
+
+
+def backfill_table(table_name):
+    """Set NULL tenant_ids to SYSTEM in batches to keep lock times short"""
+    total = 0
+    while True:
+        names = frappe.db.sql_list(f"""
+            SELECT name FROM `{table_name}`
+            WHERE tenant_id IS NULL
+            LIMIT {BATCH_SIZE}
+        """)
+        if not names:
+            return total
+
+        frappe.db.sql(f"""
+            UPDATE `{table_name}` SET tenant_id = 'SYSTEM'
+            WHERE name IN %s AND tenant_id IS NULL
+        """, (tuple(names),))
+        frappe.db.commit()
+        total += len(names)
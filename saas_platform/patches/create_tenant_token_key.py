@@ -0,0 +1,12 @@
+"""
+Create the tenant token signing key on sites installed before it was
+generated at install time (it used to be created lazily on first use,
+which let concurrent workers write different keys).
+"""
+
+from saas_platform.utils.tenant_token import ensure_signing_key
+
+
+def execute():
+    """Main patch execution - called by bench migrate"""
+    ensure_signing_key()
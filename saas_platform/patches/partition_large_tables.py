@@ -0,0 +1,26 @@
+"""
+Partition the largest ledger tables on tenant_id
+
+Opt-in: runs only when `saas_partitioning_enabled` is set in
+site_config.json, because repartitioning copies each table and blocks
+writes while it runs. Sites that enable it later can run the same step
+by hand:
+
+    bench --site dev.localhost execute saas_platform.utils.partitioning.partition_large_tables
+
+See saas_platform/utils/partitioning.py for the table selection and
+layout settings.
+"""
+
+import frappe
+
+from saas_platform.utils.partitioning import partition_large_tables
+
+
+def execute():
+    """Main patch execution - called by bench migrate"""
+    if not frappe.conf.get("saas_partitioning_enabled"):
+        print("\n⏭️  Tenant partitioning disabled (saas_partitioning_enabled), skipping")
+        return
+
+    partition_large_tables()
@@ -3,6 +3,9 @@
 
 import frappe
 
+from saas_platform.utils.tenant_resolver import resolve_tenant_id
+from saas_platform.utils.tenant_predicate import get_tenant_condition
+
 
 def get_tenant_query(user):
     """
@@ -24,14 +27,11 @@ def get_tenant_query(user):
 
     # Get user's tenant_id
     try:
-        user_tenant_id = frappe.db.get_value("User", user, "tenant_id")
-
-        if not user_tenant_id:
-            # User has no tenant - only show SYSTEM data
-            return "`tabDocType`.tenant_id = 'SYSTEM'"
+        user_tenant_id = resolve_tenant_id(user)
 
         # Show user's tenant data + SYSTEM shared data
-        return f"`tabDocType`.tenant_id IN ('{user_tenant_id}', 'SYSTEM')"
+        # (only SYSTEM data if the user has no tenant)
+        return get_tenant_condition("DocType", user_tenant_id)
 
     except Exception as e:
         frappe.log_error(f"Error in get_tenant_query: {str(e)}")
@@ -57,13 +57,10 @@ def get_tenant_query_for_doctype(doctype):
 
     # Get user's tenant_id
     try:
-        user_tenant_id = frappe.db.get_value("User", user, "tenant_id")
-
-        if not user_tenant_id:
-            return f"`tab{doctype}`.tenant_id = 'SYSTEM'"
+        user_tenant_id = resolve_tenant_id(user)
 
         # Show user's tenant data + SYSTEM shared data
-        return f"`tab{doctype}`.tenant_id IN ('{user_tenant_id}', 'SYSTEM')"
+        return get_tenant_condition(doctype, user_tenant_id)
 
     except Exception as e:
         frappe.log_error(f"Error in get_tenant_query_for_doctype: {str(e)}")
@@ -96,7 +93,7 @@ def has_permission(doc, ptype, user):
 
     # Get user's tenant_id
     try:
-        user_tenant_id = frappe.db.get_value("User", user, "tenant_id")
+        user_tenant_id = resolve_tenant_id(user)
 
         # User must belong to same tenant
         return doc.tenant_id == user_tenant_id
@@ -0,0 +1,244 @@
+"""
+Staged tenant site provisioning
+
+Provisioning runs as a pipeline of stages (create site, install apps,
+configure, activate). Each stage has its own timeout and retry policy,
+progress and per-stage timings are persisted on the Tenant, and a global
+cap limits how many provisions run at once. Tenants over the cap are
+marked Queued and picked up by the `process_provisioning_queue` job.
+
+site_config keys:
+    saas_max_concurrent_provisions: global cap (default 2)
+    saas_provisioning_stage_timeouts: {"create_site": 900, ...} overrides
+"""
+
+import json
+import time
+
+import frappe
+from frappe.utils.password import (
+    get_decrypted_password,
+    remove_encrypted_password,
+    set_encrypted_password,
+)
+
+from saas_platform.site_admin import run_bench, update_site_config
+from saas_platform.site_pool import claim_spare_site
+from saas_platform.utils.outbox import emit_event
+from saas_platform.utils.tenant_routing import invalidate_routing_table
+from saas_platform.utils.tenant_session import on_tenant_change
+from saas_platform.utils.tenant_status import set_tenant_status
+
+DEFAULT_MAX_CONCURRENT = 2
+SLOTS_KEY = "saas_platform:provisioning_slots"
+# Slots held longer than this are assumed leaked by a killed worker
+STALE_SLOT_SECONDS = 3 * 60 * 60
+PASSWORD_FIELD = "provisioning_password"
+
+
+def create_site(ctx):
+    """Stage: claim a spare site from the pool or create an empty one"""
+    if claim_spare_site(ctx["site_name"], ctx["password"]):
+        ctx["pooled"] = True
+        return
+
+    cmd = [
+        "bench", "new-site", ctx["site_name"],
+        "--admin-password", ctx["password"],
+    ]
+    if ctx["attempt"] > 1:
+        # A failed attempt may have left a half-created site behind
+        cmd.append("--force")
+
+    run_bench(cmd, ctx["timeout"])
+
+
+def install_apps(ctx):
+    """Stage: install ERPNext and saas_platform (pooled sites have them)"""
+    if ctx.get("pooled"):
+        return
+
+    run_bench(
+        ["bench", "--site", ctx["site_name"],
+         "install-app", "erpnext", "saas_platform"],
+        ctx["timeout"])
+
+
+def configure_site(ctx):
+    """Stage: write tenant settings into the new site's config"""
+    update_site_config(ctx["site_name"], {
+        "host_name": f"http://{ctx['site_name']}",
+        "saas_tenant_id": ctx["tenant_id"],
+    })
+
+
+def activate_tenant(ctx):
+    """Stage: link the site and mark the Tenant Active"""
+    previous_status = frappe.db.get_value("Tenant", ctx["tenant"], "status")
+    frappe.db.set_value("Tenant", ctx["tenant"], {
+        "site_name": ctx["site_name"],
+        "status": "Active",
+    })
+    emit_event("Tenant Status Changed", ctx["tenant_id"], payload={
+        "tenant": ctx["tenant"],
+        "status": "Active",
+        "previous_status": previous_status,
+        "site_name": ctx["site_name"],
+    })
+    set_tenant_status([ctx["tenant_id"]], "Active")
+    invalidate_routing_table()
+    on_tenant_change([ctx["tenant_id"]], status="Active")
+
+
+STAGES = (
+    {"name": "create_site", "method": create_site, "timeout": 900, "retries": 1},
+    {"name": "install_apps", "method": install_apps, "timeout": 1800, "retries": 1},
+    {"name": "configure", "method": configure_site, "timeout": 60, "retries": 2},
+    {"name": "activate", "method": activate_tenant, "timeout": 60, "retries": 2},
+)
+
+
+def provision_tenant_site(tenant, password=None):
+    """
+    Run the provisioning pipeline for a Tenant
+
+    If the concurrency cap is reached the Tenant is queued (password kept
+    encrypted) and provisioned later by process_provisioning_queue.
+
+    Args:
+            tenant: Tenant name
+            password: Administrator password for the new site
+    """
+    if password:
+        set_encrypted_password("Tenant", tenant, password, PASSWORD_FIELD)
+    else:
+        password = get_decrypted_password(
+            "Tenant", tenant, PASSWORD_FIELD, raise_exception=False)
+
+    if not password:
+        frappe.throw(f"No admin password stored for tenant {tenant}")
+
+    token = acquire_slot()
+    if not token:
+        set_progress(tenant, status="Queued")
+        return
+
+    try:
+        run_pipeline(tenant, password)
+    finally:
+        release_slot(token)
+
+
+def run_pipeline(tenant, password):
+    doc = frappe.get_doc("Tenant", tenant)
+    ctx = {
+        "tenant": doc.name,
+        "tenant_id": doc.tenant_id,
+        "site_name": f"{doc.subdomain}.localhost",
+        "password": password,
+    }
+    log = {}
+    timeouts = frappe.conf.get("saas_provisioning_stage_timeouts") or {}
+
+    for stage in STAGES:
+        name = stage["name"]
+        ctx["timeout"] = timeouts.get(name, stage["timeout"])
+        set_progress(tenant, status="Running", stage=name, log=log)
+
+        start = time.monotonic()
+        for attempt in range(1, stage["retries"] + 2):
+            ctx["attempt"] = attempt
+            try:
+                stage["method"](ctx)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                frappe.db.rollback()
+                if attempt <= stage["retries"]:
+                    time.sleep(min(2 ** attempt, 30))
+
+        log[name] = {
+            "seconds": round(time.monotonic() - start, 2),
+            "attempts": attempt,
+        }
+        if error:
+            log[name]["error"] = str(error)[-1000:]
+            set_progress(tenant, status="Failed", stage=name, log=log)
+            frappe.log_error(
+                f"Provisioning of tenant {tenant} failed at stage {name}: {error}",
+                "Tenant Provisioning")
+            return False
+
+    set_progress(tenant, status="Completed", stage="", log=log)
+    remove_encrypted_password("Tenant", tenant, PASSWORD_FIELD)
+    frappe.db.commit()
+    return True
+
+
+def set_progress(tenant, status, stage=None, log=None):
+    """Persist pipeline progress on the Tenant right away"""
+    values = {"provisioning_status": status}
+    if stage is not None:
+        values["provisioning_stage"] = stage
+    if log is not None:
+        values["provisioning_log"] = json.dumps(log, indent=1)
+
+    frappe.db.set_value("Tenant", tenant, values, update_modified=False)
+    frappe.db.commit()
+
+
+def process_provisioning_queue():
+    """Scheduler job: start queued provisions while slots are free"""
+    queued = frappe.get_all(
+        "Tenant", filters={"provisioning_status": "Queued"},
+        order_by="creation asc", pluck="name",
+        limit=get_max_concurrent())
+
+    for tenant in queued:
+        frappe.enqueue(
+            "saas_platform.tasks.provision_site",
+            queue="long",
+            timeout=get_pipeline_timeout(),
+            job_id=f"saas_provision_{tenant}",
+            deduplicate=True,
+            tenant=tenant,
+        )
+
+
+def get_pipeline_timeout():
+    """Worst-case job runtime: every stage timing out on every attempt"""
+    timeouts = frappe.conf.get("saas_provisioning_stage_timeouts") or {}
+    return sum(timeouts.get(s["name"], s["timeout"]) * (s["retries"] + 1)
+               for s in STAGES)
+
+
+def get_max_concurrent():
+    return int(frappe.conf.get(
+        "saas_max_concurrent_provisions", DEFAULT_MAX_CONCURRENT))
+
+
+def acquire_slot():
+    """
+    Take a slot of the global provisioning semaphore (Redis sorted set)
+
+    Returns:
+            str: Slot token, or None if the cap is reached
+    """
+    cache = frappe.cache()
+    key = cache.make_key(SLOTS_KEY)
+    now = time.time()
+    token = frappe.generate_hash(length=12)
+
+    cache.zremrangebyscore(key, 0, now - STALE_SLOT_SECONDS)
+    cache.zadd(key, {token: now})
+    if cache.zrank(key, token) < get_max_concurrent():
+        return token
+
+    cache.zrem(key, token)
+    return None
+
+
+def release_slot(token):
+    cache = frappe.cache()
+    cache.zrem(cache.make_key(SLOTS_KEY), token)
@@ -4,6 +4,9 @@
 import frappe
 from frappe.model.document import Document
 
+from saas_platform.utils.plan_limits import clear_tenant_limits
+from saas_platform.utils.tenant_session import on_plan_update
+
 
 class Plan(Document):
     def validate(self):
@@ -16,7 +19,20 @@ class Plan(Document):
         if self.plan_type in ["Business Basic", "Business Pro"] and not self.price:
             frappe.throw(f"{self.plan_type} must have a price")
 
+        # One document limit per DocType
+        seen = set()
+        for row in self.document_limits:
+            if row.document_type in seen:
+                frappe.throw(f"Document limit for {row.document_type} is set twice")
+            seen.add(row.document_type)
+
     def before_insert(self):
         """Set tenant_id to SYSTEM for shared plans"""
         if not self.tenant_id:
             self.tenant_id = "SYSTEM"
+
+    def on_update(self):
+        """Limits are cached per tenant, drop them all"""
+        clear_tenant_limits()
+        # Sessions carry the plan's limits version
+        on_plan_update(self)
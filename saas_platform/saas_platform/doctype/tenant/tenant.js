@@ -1,8 +1,27 @@
 // Copyright (c) 2025, Asofi and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("Tenant", {
-// 	refresh(frm) {
+frappe.ui.form.on("Tenant", {
+	refresh(frm) {
+		if (!frm.is_new()) {
+			frm.call("get_usage").then(({ message: usage }) => {
+				frm.dashboard.add_indicator(__("Users: {0}", [usage.users]), "blue");
+				frm.dashboard.add_indicator(__("Documents: {0}", [usage.documents]), "blue");
+				const storage_mb = (usage.file_size / (1024 * 1024)).toFixed(1);
+				frm.dashboard.add_indicator(__("Storage: {0} MB", [storage_mb]), "blue");
+			});
+		}
 
-// 	},
-// });
+		const purgeable = ["Suspended", "Deleted"].includes(frm.doc.status);
+		const purging = ["Queued", "Running"].includes(frm.doc.purge_status);
+
+		if (purgeable && !purging && frappe.user.has_role("System Manager")) {
+			frm.add_custom_button(__("Purge Data"), () => {
+				frappe.confirm(
+					__("Permanently delete all data of this tenant, then the tenant itself?"),
+					() => frm.call("purge_data").then(() => frm.reload_doc())
+				);
+			});
+		}
+	},
+});
@@ -6,6 +6,16 @@ from frappe.model.document import Document
 import uuid
 from frappe.utils import nowdate, add_days
 
+from saas_platform.utils.naming import allocate_unique_value
+from saas_platform.utils.outbox import emit_event, rollback_to_savepoint, savepoint
+from saas_platform.utils.plan_limits import clear_tenant_limits
+from saas_platform.utils.tenant_purge import queue_purge
+from saas_platform.utils.tenant_resolver import clear_user_tenant_cache
+from saas_platform.utils.tenant_routing import invalidate_routing_table
+from saas_platform.utils.tenant_session import on_tenant_change
+from saas_platform.utils.tenant_status import set_tenant_status
+from saas_platform.utils.usage import get_tenant_usage
+
 
 class Tenant(Document):
     def get_default_currency(self):
@@ -47,36 +57,105 @@ class Tenant(Document):
             frappe.throw("Invalid email address")
 
     def after_insert(self):
-        """Auto-create Customer, Company, Admin User, and Subscription after tenant creation"""
+        """
+        Create the cheap, required onboarding records (Customer, Admin User)
+        in the insert transaction and defer Company and Subscription to an
+        idempotent background job that only runs once this insert commits.
+        """
         frappe.log(
             f"Tenant {self.tenant_name} created with tenant_id: {self.tenant_id}")
+        emit_event("Tenant Created", self.tenant_id,
+                   payload={"tenant": self.name, "status": self.status})
 
         # 1. Create Customer (SYSTEM tenant_id - this is OUR customer for billing)
-        customer_name = self.create_customer()
-
-        # 2. Create default Company for the tenant (tenant's own company)
-        self.create_company()
+        self.db_set("customer", self.create_customer(), update_modified=False)
 
-        # 3. Create or update admin user for the tenant
+        # 2. Create or update admin user for the tenant
         self.setup_admin_user()
 
-        # 4. Create Subscription with Free Plan (links Customer to Plan)
-        self.create_subscription(customer_name)
+        # 3. Company and Subscription are slow (chart of accounts, warehouses)
+        self.db_set("onboarding_status", "Pending", update_modified=False)
+        frappe.enqueue_doc(
+            "Tenant", self.name, "complete_onboarding",
+            queue="long", timeout=1500, enqueue_after_commit=True)
+
+    def on_update(self):
+        """Publish status changes to the tenant change outbox"""
+        if self.has_value_changed("plan"):
+            clear_tenant_limits(self.tenant_id)
+
+        if self.has_value_changed("status"):
+            set_tenant_status([self.tenant_id], self.status)
+
+        if (self.flags.in_insert or self.has_value_changed("subdomain")
+                or self.has_value_changed("site_name")):
+            invalidate_routing_table()
+
+        if self.flags.in_insert:
+            return
+
+        if self.has_value_changed("status") or self.has_value_changed("plan"):
+            # Rewrite (or revoke) the tenant snapshot in its users' sessions
+            on_tenant_change([self.tenant_id], self.status)
+
+        if not self.has_value_changed("status"):
+            return
+
+        previous = self.get_doc_before_save()
+        emit_event("Tenant Status Changed", self.tenant_id, payload={
+            "tenant": self.name,
+            "status": self.status,
+            "previous_status": previous.status if previous else None,
+        })
+
+    def on_update_after_submit(self):
+        self.on_update()
+
+    def on_trash(self):
+        emit_event("Tenant Deleted", self.tenant_id, payload={"tenant": self.name})
+        set_tenant_status([self.tenant_id], None)
+        invalidate_routing_table()
+
+    @frappe.whitelist()
+    def purge_data(self):
+        """Queue the removal of all of this tenant's data and the Tenant itself"""
+        frappe.only_for("System Manager")
+        queue_purge(self.name)
+
+    @frappe.whitelist()
+    def get_usage(self):
+        """Users, documents and file storage from the usage counters"""
+        return get_tenant_usage(self.tenant_id)
+
+    def complete_onboarding(self):
+        """
+        Background job: create the tenant's Company and Subscription
+
+        Safe to re-run - existing records are reused - and all-or-nothing,
+        a failure rolls back both records and marks onboarding Failed.
+        """
+        try:
+            # Create default Company for the tenant (tenant's own company)
+            self.create_company()
 
-        # Save changes
-        self.save()
+            # Create Subscription with Free Plan (links Customer to Plan)
+            self.create_subscription(self.customer)
+
+            self.db_set("onboarding_status", "Completed", update_modified=False)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            self.db_set("onboarding_status", "Failed",
+                        update_modified=False, commit=True)
+            frappe.log_error(
+                f"Onboarding failed for tenant {self.tenant_id}", "Tenant Onboarding")
+            raise
 
     def create_customer(self):
         """Create ERPNext Customer for billing (tenant_id = SYSTEM)"""
         try:
-            customer_name = f"{self.tenant_name}"
-
-            # Check if customer with this name already exists
-            if frappe.db.exists("Customer", customer_name):
-                counter = 1
-                while frappe.db.exists("Customer", f"{customer_name} {counter}"):
-                    counter += 1
-                customer_name = f"{customer_name} {counter}"
+            # First free "<tenant_name>", "<tenant_name> 1", ...
+            customer_name = allocate_unique_value("Customer", self.tenant_name)
 
             customer = frappe.get_doc({
                 "doctype": "Customer",
@@ -91,7 +170,6 @@ class Tenant(Document):
             # Set tenant_id = SYSTEM (this is OUR customer, not tenant's data)
             frappe.db.set_value("Customer", customer.name,
                                 "tenant_id", "SYSTEM", update_modified=False)
-            frappe.db.commit()
 
             frappe.log(
                 f"Created customer: {customer.name} for tenant: {self.tenant_id}")
@@ -103,16 +181,16 @@ class Tenant(Document):
             frappe.throw(f"Failed to create customer: {str(e)}")
 
     def create_company(self):
-        """Create ERPNext Company for tenant's own use"""
-        try:
-            company_name = self.tenant_name
+        """Create ERPNext Company for tenant's own use (reused if it exists)"""
+        existing = self.company or frappe.db.get_value(
+            "Company", {"tenant_id": self.tenant_id})
+        if existing:
+            self.db_set("company", existing, update_modified=False)
+            return existing
 
-            # Check if company with this name already exists
-            if frappe.db.exists("Company", company_name):
-                counter = 1
-                while frappe.db.exists("Company", f"{company_name} {counter}"):
-                    counter += 1
-                company_name = f"{company_name} {counter}"
+        try:
+            # First free "<tenant_name>", "<tenant_name> 1", ...
+            company_name = allocate_unique_value("Company", self.tenant_name)
 
             company = frappe.get_doc({
                 "doctype": "Company",
@@ -126,10 +204,11 @@ class Tenant(Document):
             # Set tenant_id = tenant's ID (this is tenant's company)
             frappe.db.set_value(
                 "Company", company.name, "tenant_id", self.tenant_id, update_modified=False)
-            frappe.db.commit()
+            self.db_set("company", company.name, update_modified=False)
 
             frappe.log(
                 f"Created company: {company.name} for tenant: {self.tenant_id}")
+            return company.name
 
         except Exception as e:
             frappe.log_error(
@@ -138,12 +217,15 @@ class Tenant(Document):
 
     def setup_admin_user(self):
         """Create or update admin user for this tenant"""
+        savepoint("setup_admin_user")
         try:
             if frappe.db.exists("User", self.admin_email):
                 # User exists - just set tenant_id
                 frappe.db.set_value(
                     "User", self.admin_email, "tenant_id", self.tenant_id, update_modified=False)
-                frappe.db.commit()
+                clear_user_tenant_cache(self.admin_email)
+                emit_event("User Tenant Changed", self.tenant_id,
+                           user=self.admin_email)
                 frappe.log(
                     f"Updated existing user {self.admin_email} with tenant_id: {self.tenant_id}")
             else:
@@ -168,15 +250,17 @@ class Tenant(Document):
                 # Set tenant_id
                 frappe.db.set_value(
                     "User", user.name, "tenant_id", self.tenant_id, update_modified=False)
-                frappe.db.commit()
+                clear_user_tenant_cache(user.name)
+                emit_event("User Tenant Changed", self.tenant_id, user=user.name)
 
                 frappe.log(
                     f"Created admin user: {self.admin_email} for tenant: {self.tenant_id}")
 
         except Exception as e:
+            # Undo partial writes but keep the tenant - user can be set up later
+            rollback_to_savepoint("setup_admin_user")
             frappe.log_error(
                 f"Failed to setup admin user for tenant {self.tenant_id}: {str(e)}")
-            # Don't throw - user can be set up later
 
     def create_subscription(self, customer_name):
         """Create Subscription linking Customer to Free Plan"""
@@ -207,11 +291,11 @@ class Tenant(Document):
             # Set tenant_id = SYSTEM (this is OUR subscription record)
             frappe.db.set_value("Subscription", subscription.name,
                                 "tenant_id", "SYSTEM", update_modified=False)
-            frappe.db.commit()
 
-            self.subscription = subscription.name
-            self.trial_expiry = add_days(nowdate(), 14)
-            self.status = "Trial"
+            self.db_set({
+                "subscription": subscription.name,
+                "trial_expiry": self.trial_expiry or add_days(nowdate(), 14),
+            }, update_modified=False)
 
             frappe.log(
                 f"Created subscription: {subscription.name} for tenant: {self.tenant_id}")
@@ -219,7 +303,7 @@ class Tenant(Document):
         except Exception as e:
             frappe.log_error(
                 f"Failed to create subscription for tenant {self.tenant_id}: {str(e)}")
-            # Don't throw - subscription can be created later
+            frappe.throw(f"Failed to create subscription: {str(e)}")
 
     def create_free_subscription_plan(self):
         """Create a Free Subscription Plan if it doesn't exist"""
@@ -250,7 +334,6 @@ class Tenant(Document):
                 item.insert(ignore_permissions=True)
 
             plan.insert(ignore_permissions=True)
-            frappe.db.commit()
             frappe.log(f"Created Free Subscription Plan")
         except Exception as e:
             frappe.log_error(
@@ -262,11 +345,10 @@ class Tenant(Document):
         words = self.tenant_name.split()
         abbr = ''.join([w[0].upper() for w in words if w])[:5]
 
-        # Ensure uniqueness
-        base_abbr = abbr
-        counter = 1
-        while frappe.db.exists('Company', {'abbr': abbr}):
-            abbr = f"{base_abbr}{counter}"
-            counter += 1
+        # Ensure uniqueness ("AC", "AC1", "AC2", ...)
+        return allocate_unique_value("Company", abbr, fieldname="abbr", separator="")
+
 
-        return abbr
+def on_doctype_update():
+    # Trial sweeper and warning mailer filter on status + trial_expiry
+    frappe.db.add_index("Tenant", ["status", "trial_expiry"])
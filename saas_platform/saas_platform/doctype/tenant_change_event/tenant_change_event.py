@@ -0,0 +1,13 @@
+# Copyright (c) 2025, Asofi and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TenantChangeEvent(Document):
+    """Append-only outbox row, written via saas_platform.utils.outbox"""
+
+    def validate(self):
+        if not self.is_new():
+            frappe.throw("Tenant Change Events are append-only")
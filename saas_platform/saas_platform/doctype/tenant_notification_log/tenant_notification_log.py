@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Asofi and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TenantNotificationLog(Document):
+    pass
+
+
+def get_log_name(tenant, warning_type, trial_expiry):
+    """Ledger key - one row per tenant, warning type and trial expiry date"""
+    return f"{tenant}::{warning_type}::{trial_expiry}"
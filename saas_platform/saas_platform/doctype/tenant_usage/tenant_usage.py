@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Asofi and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TenantUsage(Document):
+    pass
+
+
+def get_usage_name(tenant_id, doctype):
+    """Ledger key - one row per tenant and DocType"""
+    return f"{tenant_id}::{doctype}"
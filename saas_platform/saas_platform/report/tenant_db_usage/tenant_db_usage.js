@@ -0,0 +1,18 @@
+// Copyright (c) 2026, Asofi and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Tenant DB Usage"] = {
+	filters: [
+		{
+			fieldname: "minutes",
+			label: __("Last N Minutes"),
+			fieldtype: "Int",
+			default: 60,
+		},
+		{
+			fieldname: "by_doctype",
+			label: __("Break Down by DocType"),
+			fieldtype: "Check",
+		},
+	],
+};
@@ -0,0 +1,44 @@
+# Copyright (c) 2026, Asofi and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from saas_platform.utils.query_cost import get_usage
+
+
+def execute(filters=None):
+    """Top tenants by DB time from the query cost instrumentation"""
+    filters = frappe._dict(filters or {})
+    by_doctype = bool(filters.by_doctype)
+
+    data = get_usage(filters.minutes, by_doctype=by_doctype)
+
+    tenants = dict(frappe.get_all(
+        "Tenant", filters={"tenant_id": ["in", list({row.tenant_id for row in data})]},
+        fields=["tenant_id", "name"], as_list=True)) if data else {}
+    for row in data:
+        row.tenant = tenants.get(row.tenant_id)
+
+    return get_columns(by_doctype), data
+
+
+def get_columns(by_doctype):
+    columns = [
+        {"fieldname": "tenant", "label": _("Tenant"), "fieldtype": "Link",
+         "options": "Tenant", "width": 180},
+        {"fieldname": "tenant_id", "label": _("Tenant ID"), "fieldtype": "Data", "width": 110},
+    ]
+    if by_doctype:
+        columns.append({"fieldname": "doctype", "label": _("DocType"), "fieldtype": "Link",
+                        "options": "DocType", "width": 180})
+    columns += [
+        {"fieldname": "db_time", "label": _("DB Time (s)"), "fieldtype": "Float",
+         "precision": 3, "width": 120},
+        {"fieldname": "share", "label": _("Share of DB Time (%)"), "fieldtype": "Percent",
+         "width": 150},
+        {"fieldname": "queries", "label": _("Queries"), "fieldtype": "Int", "width": 100},
+        {"fieldname": "rows_returned", "label": _("Rows Returned / Affected"),
+         "fieldtype": "Int", "width": 170},
+    ]
+    return columns
@@ -0,0 +1,19 @@
+// Copyright (c) 2026, Asofi and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Tenant Plan Limits"] = {
+	filters: [
+		{
+			fieldname: "threshold",
+			label: __("Usage at least (%)"),
+			fieldtype: "Percent",
+			default: 80,
+		},
+		{
+			fieldname: "tenant",
+			label: __("Tenant"),
+			fieldtype: "Link",
+			options: "Tenant",
+		},
+	],
+};
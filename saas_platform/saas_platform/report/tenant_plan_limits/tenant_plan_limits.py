@@ -0,0 +1,87 @@
+# Copyright (c) 2026, Asofi and contributors
+# For license information, please see license.txt
+
+from collections import defaultdict
+
+import frappe
+from frappe import _
+
+from saas_platform.utils.plan_limits import get_tenant_limits, is_unlimited
+from saas_platform.utils.rate_limit import get_store
+
+GB = 1024 ** 3
+
+
+def execute(filters=None):
+    """Tenants at or near their plan limits, from the usage counters"""
+    filters = frappe._dict(filters or {})
+    threshold = filters.threshold if filters.threshold is not None else 80
+
+    tenant_filters = {"status": ["!=", "Deleted"]}
+    if filters.tenant:
+        tenant_filters["name"] = filters.tenant
+    tenants = frappe.get_all(
+        "Tenant", filters=tenant_filters, fields=["name", "tenant_id", "plan"])
+    tenant_ids = [t.tenant_id for t in tenants if t.tenant_id]
+    if not tenant_ids:
+        return get_columns(), []
+
+    usage = defaultdict(dict)
+    for row in frappe.get_all(
+            "Tenant Usage", filters={"tenant_id": ["in", tenant_ids]},
+            fields=["tenant_id", "ref_doctype", "document_count", "file_size"]):
+        usage[row.tenant_id][row.ref_doctype] = row
+    api_calls = get_store().get_daily_counts(tenant_ids)
+
+    data = []
+    for tenant in tenants:
+        limits = get_tenant_limits(tenant.tenant_id)
+        if not limits:
+            continue
+        tenant_usage = usage[tenant.tenant_id]
+
+        def count(doctype):
+            row = tenant_usage.get(doctype)
+            return row.document_count if row else 0
+
+        file_row = tenant_usage.get("File")
+        checks = [
+            (_("Users"), count("User"), limits.get("max_users")),
+            (_("Storage (GB)"), round((file_row.file_size if file_row else 0) / GB, 2),
+             limits.get("max_storage_gb")),
+            (_("API Calls Today"), api_calls.get(tenant.tenant_id, 0),
+             limits.get("max_api_calls_per_day")),
+        ] + [
+            (_("{0} Documents").format(_(doctype)), count(doctype), limit)
+            for doctype, limit in limits["document_limits"].items()
+        ]
+
+        for resource, used, limit in checks:
+            if is_unlimited(limit):
+                continue
+            percent = 100 * used / limit
+            if percent >= threshold:
+                data.append({
+                    "tenant": tenant.name,
+                    "plan": limits["plan"],
+                    "resource": resource,
+                    "used": used,
+                    "limit": limit,
+                    "percent": round(percent, 1),
+                })
+
+    data.sort(key=lambda row: row["percent"], reverse=True)
+    return get_columns(), data
+
+
+def get_columns():
+    return [
+        {"fieldname": "tenant", "label": _("Tenant"), "fieldtype": "Link",
+         "options": "Tenant", "width": 180},
+        {"fieldname": "plan", "label": _("Plan"), "fieldtype": "Link",
+         "options": "Plan", "width": 130},
+        {"fieldname": "resource", "label": _("Resource"), "fieldtype": "Data", "width": 180},
+        {"fieldname": "used", "label": _("Used"), "fieldtype": "Float", "width": 100},
+        {"fieldname": "limit", "label": _("Limit"), "fieldtype": "Float", "width": 100},
+        {"fieldname": "percent", "label": _("Used (%)"), "fieldtype": "Percent", "width": 100},
+    ]
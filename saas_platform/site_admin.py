@@ -0,0 +1,200 @@
+"""
+In-process administration of the bench's sites
+
+Site config edits, maintenance mode and per-site operations run in the
+current worker instead of starting a `bench` process per site: file
+edits are plain site_config.json writes, and operations that need the
+database connect to the target site in a worker thread. Independent
+sites are processed concurrently on a bounded pool and every batch
+returns one structured result per site.
+
+Only site creation and app installation, which need a fresh process
+(DB root access, full app import and migrate), still go through the
+bench CLI via `run_bench`, with a timeout and the exit code checked.
+
+site_config keys:
+    saas_site_admin_workers: sites processed in parallel (default 8)
+"""
+
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import frappe
+from filelock import FileLock
+from frappe.utils.password import update_password
+
+DEFAULT_WORKERS = 8
+
+
+def get_sites_path():
+    return os.path.abspath(frappe.local.sites_path)
+
+
+def get_site_config_path(site, sites_path=None):
+    return os.path.join(sites_path or get_sites_path(), site, "site_config.json")
+
+
+def read_site_config(site, sites_path=None):
+    """site_config.json of a site, empty if missing or unreadable"""
+    try:
+        with open(get_site_config_path(site, sites_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_site_config(site, values, sites_path=None):
+    """
+    Set keys in a site's site_config.json with one locked, atomic write
+
+    Uses no frappe.local state when sites_path is given, so it is safe
+    in pool threads.
+
+    Args:
+            site: Site name
+            values: {key: value}, None removes the key
+            sites_path: Bench sites folder, defaults to the current one
+    """
+    sites_path = sites_path or get_sites_path()
+    site_config_path = get_site_config_path(site, sites_path)
+    # Same lock file as frappe.installer.update_site_config
+    lock_path = os.path.join(sites_path, site, "locks", "site_config.lock")
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+
+    with FileLock(lock_path, timeout=30):
+        # Unlike read_site_config, never overwrite an unreadable config
+        try:
+            with open(site_config_path) as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            config = {}
+
+        for key, value in values.items():
+            if value is None:
+                config.pop(key, None)
+            else:
+                config[key] = value
+
+        tmp_path = f"{site_config_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(config, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, site_config_path)
+
+
+def update_site_configs(values_by_site, max_workers=None):
+    """
+    Set keys in many sites' config concurrently
+
+    Args:
+            values_by_site: {site: {key: value}}
+
+    Returns:
+            dict: site -> result, see run_on_sites
+    """
+    # Resolved here, frappe.local is empty in the pool threads
+    sites_path = get_sites_path()
+    return run_on_sites(
+        lambda site: update_site_config(site, values_by_site[site], sites_path),
+        list(values_by_site), max_workers)
+
+
+def set_maintenance_mode(sites, enabled, max_workers=None):
+    """
+    Toggle maintenance mode on many sites (what `bench set-maintenance-mode` does)
+
+    Returns:
+            dict: site -> result, see run_on_sites
+    """
+    value = 1 if enabled else 0
+    return update_site_configs(
+        {site: {"maintenance_mode": value} for site in sites}, max_workers)
+
+
+def set_admin_password(site, password):
+    """Set the Administrator password on another site of this bench"""
+    result = run_on_sites(
+        lambda _: update_password("Administrator", password), [site], 1,
+        connect=True)[site]
+    if result.error:
+        frappe.throw(f"Could not set the Administrator password on {site}: {result.error}")
+
+
+def run_on_sites(fn, sites, max_workers=None, connect=False):
+    """
+    Run fn(site) for many sites on a bounded thread pool
+
+    Args:
+            fn: Callable taking the site name
+            sites: Site names
+            max_workers: Pool size (site_config `saas_site_admin_workers`)
+            connect: Initialise and connect to each site (frappe.db is
+                     then the site's database), committing on success
+
+    Returns:
+            dict: site -> {"site", "ok", "result", "error", "duration"};
+                  a failure on one site never stops the others
+    """
+    max_workers = max_workers or frappe.conf.get("saas_site_admin_workers") or DEFAULT_WORKERS
+    sites_path = frappe.local.sites_path
+
+    def run(site):
+        if not connect:
+            return fn(site)
+
+        frappe.init(site=site, sites_path=sites_path)
+        frappe.connect()
+        try:
+            result = fn(site)
+            frappe.db.commit()
+            return result
+        except Exception:
+            frappe.db.rollback()
+            raise
+        finally:
+            frappe.destroy()
+
+    def timed(site):
+        start = time.monotonic()
+        try:
+            return run(site), None, time.monotonic() - start
+        except Exception as e:
+            return None, str(e), time.monotonic() - start
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = {pool.submit(timed, site): site for site in sites}
+        for future in as_completed(futures):
+            site = futures[future]
+            result, error, duration = future.result()
+            results[site] = frappe._dict(
+                site=site, ok=error is None, result=result, error=error,
+                duration=round(duration, 3))
+
+    return results
+
+
+def run_bench(cmd, timeout):
+    """
+    Run a bench command, for operations that need their own process
+
+    Returns:
+            str: Command output
+
+    Raises:
+            frappe.ValidationError on timeout or non-zero exit
+    """
+    try:
+        result = subprocess.run(
+            cmd, cwd=frappe.get_bench_path(), timeout=timeout,
+            capture_output=True, text=True)
+    except subprocess.TimeoutExpired:
+        raise frappe.ValidationError(f"{' '.join(cmd[:4])} timed out after {timeout}s")
+
+    if result.returncode != 0:
+        raise frappe.ValidationError(
+            f"{' '.join(cmd[:4])} failed ({result.returncode}): "
+            f"{(result.stderr or result.stdout)[-1000:]}")
+    return result.stdout
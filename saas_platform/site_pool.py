@@ -0,0 +1,190 @@
+"""
+Pre-warmed site pool for instant tenant provisioning
+
+Keeps N fully installed spare sites (`pool-<hash>.localhost`) in the
+bench. Provisioning claims a spare by renaming its directory to
+`<subdomain>.localhost`, which is atomic, so concurrent claims can never
+hand out the same site. The pool is topped up in the background, only
+from the site flagged as pool owner in its own site_config (tenant sites
+and the spares have saas_platform installed too, and share
+common_site_config). A failed build drops its half-created site.
+
+site_config keys (central site only):
+    saas_site_pool_owner: 1 on the one site that builds spares
+
+site_config / common_site_config keys:
+    saas_site_pool_size: number of ready spare sites to keep (default 0, off)
+    saas_site_pool_refill_concurrency: sites built in parallel (default 1)
+"""
+
+import os
+import time
+
+import frappe
+
+from saas_platform.site_admin import (
+    get_sites_path,
+    read_site_config,
+    run_bench,
+    set_admin_password,
+    update_site_config,
+)
+
+POOL_PREFIX = "pool-"
+READY_FLAG = "saas_pool_ready"
+OWNER_FLAG = "saas_site_pool_owner"
+DEFAULT_POOL_SIZE = 0
+DEFAULT_REFILL_CONCURRENCY = 1
+# Builds older than this are assumed dead and no longer count as in flight
+STALE_BUILD_SECONDS = 2 * 60 * 60
+
+
+def get_pool_size():
+    return int(frappe.conf.get("saas_site_pool_size", DEFAULT_POOL_SIZE))
+
+
+def is_pool_owner():
+    """
+    Only the central site builds spares, not tenant or spare sites
+
+    Read from the site's own site_config, a flag in common_site_config
+    would make every site an owner.
+    """
+    return bool(read_site_config(frappe.local.site).get(OWNER_FLAG))
+
+
+def get_refill_concurrency():
+    return int(frappe.conf.get(
+        "saas_site_pool_refill_concurrency", DEFAULT_REFILL_CONCURRENCY))
+
+
+def list_pool_sites():
+    """
+    Returns:
+            dict: {"ready": [site, ...], "building": [site, ...]}
+    """
+    sites_path = get_sites_path()
+    pool = {"ready": [], "building": []}
+
+    for site in sorted(os.listdir(sites_path)):
+        if not site.startswith(POOL_PREFIX):
+            continue
+
+        site_path = os.path.join(sites_path, site)
+        config = read_site_config(site)
+        if config.get(READY_FLAG):
+            pool["ready"].append(site)
+        elif time.time() - os.path.getmtime(site_path) < STALE_BUILD_SECONDS:
+            pool["building"].append(site)
+
+    return pool
+
+
+def refill_pool():
+    """
+    Scheduler job: top the pool up to saas_site_pool_size.
+
+    One deduplicated job per concurrency slot, so at most
+    saas_site_pool_refill_concurrency sites are built at once.
+    """
+    if not get_pool_size() or not is_pool_owner():
+        return
+
+    pool = list_pool_sites()
+    missing = get_pool_size() - len(pool["ready"]) - len(pool["building"])
+    if missing <= 0:
+        return
+
+    for slot in range(min(missing, get_refill_concurrency())):
+        frappe.enqueue(
+            "saas_platform.site_pool.build_spare_sites",
+            queue="long",
+            timeout=STALE_BUILD_SECONDS,
+            job_id=f"saas_site_pool_slot_{slot}",
+            deduplicate=True,
+        )
+
+
+def build_spare_sites():
+    """Build spare sites one at a time until the pool is full"""
+    if not is_pool_owner():
+        return
+
+    while True:
+        pool = list_pool_sites()
+        if len(pool["ready"]) + len(pool["building"]) >= get_pool_size():
+            return
+        build_spare_site()
+
+
+def build_spare_site():
+    """Create one fully installed spare site and mark it ready"""
+    site_name = f"{POOL_PREFIX}{frappe.generate_hash(length=10)}.localhost"
+
+    try:
+        run_bench([
+            "bench", "new-site", site_name,
+            "--admin-password", frappe.generate_hash(length=20),
+            "--install-app", "erpnext",
+            "--install-app", "saas_platform"
+        ], STALE_BUILD_SECONDS)
+
+        update_site_config(site_name, {READY_FLAG: 1})
+    except Exception:
+        drop_spare_site(site_name)
+        raise
+
+    return site_name
+
+
+def drop_spare_site(site_name):
+    """Remove a failed build's site directory and database"""
+    if not os.path.exists(os.path.join(get_sites_path(), site_name)):
+        return
+
+    try:
+        run_bench([
+            "bench", "drop-site", site_name, "--force", "--no-backup"
+        ], STALE_BUILD_SECONDS)
+    except Exception as e:
+        frappe.log_error(
+            f"Could not drop failed spare site {site_name}: {str(e)}", "Site Pool")
+
+
+def claim_spare_site(site_name, admin_password):
+    """
+    Take a ready spare site and turn it into `site_name`
+
+    Args:
+            site_name: Target site, e.g. "<subdomain>.localhost"
+            admin_password: Administrator password for the tenant site
+
+    Returns:
+            str: site_name, or None if no spare site is ready
+    """
+    sites_path = get_sites_path()
+    target_path = os.path.join(sites_path, site_name)
+    if os.path.exists(target_path):
+        frappe.throw(f"Site {site_name} already exists")
+
+    for spare in list_pool_sites()["ready"]:
+        try:
+            # Atomic: a concurrent claim of the same spare fails here
+            os.rename(os.path.join(sites_path, spare), target_path)
+        except OSError:
+            continue
+
+        update_site_config(site_name, {
+            READY_FLAG: None,
+            "host_name": f"http://{site_name}",
+        })
+
+        set_admin_password(site_name, admin_password)
+
+        frappe.enqueue("saas_platform.site_pool.refill_pool",
+                       enqueue_after_commit=True)
+        return site_name
+
+    frappe.enqueue("saas_platform.site_pool.refill_pool",
+                   enqueue_after_commit=True)
+    return None
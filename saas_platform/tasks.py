@@ -1,48 +1,233 @@
-import subprocess
 import frappe
-from frappe.utils import  nowdate, add_days
-def provision_site(tenant, password):
-    doc = frappe.get_doc("Tenant", tenant)
-    site_name = f"{doc.subdomain}.localhost"
+from frappe.utils import  nowdate, add_days, now
 
-    cmd = [
-        "bench", "new-site", site_name,
-        "--admin-password", password,
-        "--install-app", "erpnext",
-        "--install-app", "saas_platform"
-    ]
+from saas_platform.provisioning import provision_tenant_site
+from saas_platform.site_admin import set_maintenance_mode
+from saas_platform.utils.outbox import emit_events
+from saas_platform.utils.tenant_session import on_tenant_change
+from saas_platform.utils.tenant_status import set_tenant_status
+from saas_platform.saas_platform.doctype.tenant_notification_log.tenant_notification_log import get_log_name
 
-    subprocess.run(cmd, cwd=frappe.get_bench_path())
+SUSPEND_BATCH_SIZE = 500
+WARNING_BATCH_SIZE = 100
 
-    doc.site_name = site_name
-    doc.status = "Active"
-    doc.save()
+
+def provision_site(tenant, password=None):
+    """Background job: provision the Tenant's site (see saas_platform.provisioning)"""
+    provision_tenant_site(tenant, password)
 
 
 def suspend_expired_trials():
-    tenants = frappe.get_all("Tenant", filters={"status": "Trial"})
-    for t in tenants:
-        doc = frappe.get_doc("Tenant", t.name)
-        if doc.trial_expiry < nowdate():
-            suspend_tenant(doc.name)
+    """Daily job: suspend every Trial tenant whose trial has expired"""
+    # Served by the (status, trial_expiry) index, see tenant.on_doctype_update
+    expired = frappe.get_all("Tenant", filters={
+        "status": "Trial",
+        "trial_expiry": ["<", nowdate()],
+    }, pluck="name")
+
+    # A tenant upgraded since the query above keeps its new status
+    return suspend_tenants(expired, from_status="Trial")
+
 
 def suspend_tenant(tenant_name):
-    doc = frappe.get_doc("Tenant", tenant_name)
-    subprocess.run(["bench", "--site", doc.site_name, "set-maintenance-mode", "on"])
-    doc.status = "Suspended"
-    doc.save()
-    
-    
+    return get_single_result(suspend_tenants([tenant_name]), tenant_name)
+
+
+def suspend_tenants(tenant_names, from_status=None):
+    """
+    Suspend many tenants at once
+
+    Statuses are updated with one UPDATE per batch and written into the
+    cached status map, so the request gate rejects the tenants' users
+    right after commit. Sites of tenants with their own site are also put
+    in maintenance mode in parallel.
+
+    Args:
+            tenant_names: List of Tenant names
+            from_status: Only suspend tenants currently in this status
+
+    Returns:
+            list: [{"tenant", "site_name", "suspended", "skipped", "error"}] per tenant
+    """
+    return update_tenant_statuses(tenant_names, "Suspended", from_status=from_status)
+
+
+def reactivate_tenant(tenant_name):
+    return get_single_result(reactivate_tenants([tenant_name]), tenant_name)
+
+
+def get_single_result(results, tenant_name):
+    """The one tenant's result, throws for an unknown tenant"""
+    if not results:
+        frappe.throw(f"Tenant {tenant_name} not found", frappe.DoesNotExistError)
+    return results[0]
+
+
+def reactivate_tenants(tenant_names):
+    """
+    Reactivate many suspended tenants at once, the reverse of suspend_tenants
+
+    Only Suspended tenants are reactivated; Trial, Deleted (possibly being
+    purged) and Active tenants are left alone and reported as skipped.
+
+    Args:
+            tenant_names: List of Tenant names
+
+    Returns:
+            list: [{"tenant", "site_name", "suspended", "skipped", "error"}] per tenant
+    """
+    return update_tenant_statuses(tenant_names, "Active", from_status="Suspended")
+
+
+def update_tenant_statuses(tenant_names, status, from_status=None):
+    """
+    Set the status of many tenants
+
+    Args:
+            tenant_names: List of Tenant names
+            status: New status
+            from_status: Only change tenants currently in this status
+    """
+    if not tenant_names:
+        return []
+
+    tenants = frappe.get_all("Tenant", filters={"name": ["in", tenant_names]},
+                             fields=["name", "tenant_id", "site_name", "status"])
+    skipped = [t for t in tenants if from_status and t.status != from_status]
+    tenants = [t for t in tenants if not from_status or t.status == from_status]
+
+    Tenant = frappe.qb.DocType("Tenant")
+    for i in range(0, len(tenants), SUSPEND_BATCH_SIZE):
+        batch = [t.name for t in tenants[i:i + SUSPEND_BATCH_SIZE]]
+        query = (frappe.qb.update(Tenant)
+            .set(Tenant.status, status)
+            .set(Tenant.modified, now())
+            .where(Tenant.name.isin(batch)))
+        if from_status:
+            query = query.where(Tenant.status == from_status)
+        query.run()
+
+    # Same transaction as the status update
+    emit_events([{
+        "event_type": "Tenant Status Changed",
+        "tenant_id": t.tenant_id,
+        "payload": {"tenant": t.name, "status": status,
+                    "previous_status": t.status},
+    } for t in tenants if t.status != status])
+    tenant_ids = [t.tenant_id for t in tenants]
+    set_tenant_status(tenant_ids, status)
+    on_tenant_change(tenant_ids, status=status)
+    frappe.db.commit()
+
+    suspended = status == "Suspended"
+    site_results = set_maintenance_mode(
+        [t.site_name for t in tenants if t.site_name], suspended,
+        max_workers=frappe.conf.get("saas_suspend_workers"))
+
+    results = [{
+        "tenant": t.name,
+        "site_name": t.site_name,
+        "suspended": t.status == "Suspended",
+        "skipped": True,
+        "error": f"Tenant is {t.status}, not {from_status}",
+    } for t in skipped]
+    for t in tenants:
+        error = site_results[t.site_name].error if t.site_name else None
+        results.append({
+            "tenant": t.name,
+            "site_name": t.site_name,
+            "suspended": suspended,
+            "skipped": False,
+            "error": error,
+        })
+        if error:
+            frappe.log_error(
+                f"Tenant {t.name} set to {status} but maintenance mode failed for "
+                f"{t.site_name}: {error}", "Tenant Suspension")
+
+    return results
+
+
 def send_trial_warning_emails():
+    """
+    Daily job: queue trial expiry warnings, in batches
+
+    Only Trial tenants expiring in exactly 3 or 1 days are read (indexed
+    on status + trial_expiry), and tenants already in the Tenant
+    Notification Log are skipped, so re-runs send nothing twice.
+    """
     today = nowdate()
-    in_three_days = add_days(today, 3)
-    in_one_day = add_days(today, 1)
+    warning_types = {
+        add_days(today, 3): "Trial Expiry 3 Days",
+        add_days(today, 1): "Trial Expiry 1 Day",
+    }
+
+    tenants = frappe.get_all("Tenant", filters={
+        "status": "Trial",
+        "trial_expiry": ["in", list(warning_types)],
+    }, fields=["name", "admin_email", "trial_expiry"])
+    if not tenants:
+        return
 
-    tenants = frappe.get_all("Tenant", fields=["name", "admin_email", "trial_expiry"])
+    warnings = []
     for t in tenants:
-        if t.trial_expiry == in_three_days or t.trial_expiry == in_one_day:
-            frappe.sendmail(
-                recipients=[t.admin_email],
-                subject="Your trial is expiring soon!",
-                message=f"Dear user, your trial expires on {t.trial_expiry}. Please subscribe to continue."
-            )    
\ No newline at end of file
+        warning_type = warning_types[str(t.trial_expiry)]
+        warnings.append({
+            "name": get_log_name(t.name, warning_type, t.trial_expiry),
+            "tenant": t.name,
+            "warning_type": warning_type,
+            "trial_expiry": str(t.trial_expiry),
+            "recipient": t.admin_email,
+        })
+
+    sent = set(frappe.get_all("Tenant Notification Log", filters={
+        "name": ["in", [w["name"] for w in warnings]]
+    }, pluck="name"))
+    warnings = [w for w in warnings if w["name"] not in sent]
+
+    for i in range(0, len(warnings), WARNING_BATCH_SIZE):
+        frappe.enqueue("saas_platform.tasks.send_trial_warning_batch",
+                       warnings=warnings[i:i + WARNING_BATCH_SIZE])
+
+
+def send_trial_warning_batch(warnings):
+    """
+    Background job: record and queue a batch of trial warnings
+
+    Ledger rows and Email Queue entries are written in the same
+    transaction, and a warning is only sent by the job whose INSERT of
+    its ledger row succeeded (an overlapping job waits on the row lock,
+    then gets a duplicate key), so no warning is queued twice.
+    """
+    sent = set(frappe.get_all("Tenant Notification Log", filters={
+        "name": ["in", [w["name"] for w in warnings]]
+    }, pluck="name"))
+    warnings = [w for w in warnings if w["name"] not in sent]
+    if not warnings:
+        return
+
+    timestamp = now()
+    inserted = []
+    for w in warnings:
+        try:
+            frappe.db.sql("""
+                INSERT INTO `tabTenant Notification Log`
+                    (name, tenant, warning_type, trial_expiry, recipient,
+                     creation, modified, owner, modified_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, 'Administrator', 'Administrator')
+            """, (w["name"], w["tenant"], w["warning_type"], w["trial_expiry"],
+                  w["recipient"], timestamp, timestamp))
+        except Exception as e:
+            if frappe.db.is_duplicate_entry(e):
+                continue  # recorded (and sent) by another job
+            raise
+        inserted.append(w)
+
+    for w in inserted:
+        frappe.sendmail(
+            recipients=[w["recipient"]],
+            subject="Your trial is expiring soon!",
+            message=f"Dear user, your trial expires on {w['trial_expiry']}. Please subscribe to continue."
+        )
+
+    frappe.db.commit()
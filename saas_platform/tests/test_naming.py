@@ -0,0 +1,54 @@
+# Copyright (c) 2025, Asofi and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from saas_platform.utils.naming import allocate_random_id, allocate_unique_value, reserve
+
+
+class TestNaming(FrappeTestCase):
+    def setUp(self):
+        # Reservations live for RESERVATION_TTL, so every test gets fresh names
+        self.base = f"Naming Test {frappe.generate_hash(length=6)}"
+
+    def make_role(self, role_name):
+        frappe.get_doc({"doctype": "Role", "role_name": role_name}).insert()
+
+    def test_free_base_is_used(self):
+        self.assertEqual(allocate_unique_value("Role", self.base), self.base)
+
+    def test_skips_existing_values(self):
+        self.make_role(self.base)
+        self.make_role(f"{self.base} 1")
+        self.make_role(f"{self.base} 3")
+
+        self.assertEqual(allocate_unique_value("Role", self.base), f"{self.base} 2")
+
+    def test_existing_values_compare_case_insensitively(self):
+        self.make_role(self.base.upper())
+        self.assertEqual(allocate_unique_value("Role", self.base), f"{self.base} 1")
+
+    def test_reserved_values_are_skipped(self):
+        self.make_role(self.base)
+
+        first = allocate_unique_value("Role", self.base)
+        second = allocate_unique_value("Role", self.base)
+
+        self.assertEqual(first, f"{self.base} 1")
+        self.assertEqual(second, f"{self.base} 2")
+
+    def test_like_wildcards_in_base_are_literal(self):
+        self.make_role(f"{self.base}_x")
+        self.assertEqual(allocate_unique_value("Role", f"{self.base}_"), f"{self.base}_")
+
+    def test_reserve_is_exclusive(self):
+        self.assertTrue(reserve("Role", "name", self.base))
+        self.assertFalse(reserve("Role", "name", self.base.lower()))
+
+    def test_random_id_is_reserved(self):
+        value = allocate_random_id("Role", "name")
+
+        self.assertEqual(len(value), 8)
+        self.assertTrue(value.isalnum() and value == value.upper())
+        self.assertFalse(reserve("Role", "name", value))
@@ -0,0 +1,62 @@
+# Copyright (c) 2025, Asofi and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from saas_platform.utils import plan_limits
+from saas_platform.utils.plan_limits import TenantLimitExceededError, check_insert_limits
+
+TENANT_ID = "LIMITTST"
+
+LIMITS = {
+    "plan": "Test Plan",
+    "max_users": 2,
+    "max_storage_gb": 1,
+    "document_limits": {"ToDo": 10},
+}
+
+
+class TestPlanLimits(FrappeTestCase):
+    def check(self, doc, usage, limits=LIMITS):
+        with patch.object(plan_limits, "get_tenant_limits", return_value=limits), \
+                patch.object(plan_limits, "get_document_usage", return_value=usage) as get_usage:
+            check_insert_limits(frappe._dict(doc), TENANT_ID)
+        return get_usage
+
+    def test_user_below_limit(self):
+        self.check({"doctype": "User"}, {"document_count": 1, "file_size": 0})
+
+    def test_user_at_limit(self):
+        with self.assertRaises(TenantLimitExceededError):
+            self.check({"doctype": "User"}, {"document_count": 2, "file_size": 0})
+
+    def test_document_limit(self):
+        self.check({"doctype": "ToDo"}, {"document_count": 9, "file_size": 0})
+        with self.assertRaises(TenantLimitExceededError):
+            self.check({"doctype": "ToDo"}, {"document_count": 10, "file_size": 0})
+
+    def test_file_storage_limit(self):
+        gb = 1024 ** 3
+        self.check({"doctype": "File", "file_size": 100}, {"document_count": 1, "file_size": gb - 100})
+        with self.assertRaises(TenantLimitExceededError):
+            self.check({"doctype": "File", "file_size": 101}, {"document_count": 1, "file_size": gb - 100})
+
+    def test_unlimited_values(self):
+        for value in (0, -1):
+            limits = dict(LIMITS, max_users=value)
+            get_usage = self.check({"doctype": "User"}, {"document_count": 1000, "file_size": 0}, limits)
+            get_usage.assert_not_called()
+
+    def test_unlimited_doctype_skips_usage(self):
+        get_usage = self.check({"doctype": "Note"}, {"document_count": 1000, "file_size": 0})
+        get_usage.assert_not_called()
+
+    def test_no_limits_for_unknown_tenant(self):
+        get_usage = self.check({"doctype": "User"}, {"document_count": 1000, "file_size": 0}, {})
+        get_usage.assert_not_called()
+
+    def test_system_tenant_has_no_limits(self):
+        self.assertEqual(plan_limits.get_tenant_limits("SYSTEM"), {})
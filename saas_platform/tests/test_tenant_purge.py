@@ -0,0 +1,87 @@
+# Copyright (c) 2025, Asofi and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from saas_platform.utils import tenant_purge
+
+TENANT_ID = "PURGETST"
+
+
+class Interrupted(Exception):
+    pass
+
+
+class StopAfter:
+    """Throttle that interrupts the purge after `chunks` chunks"""
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks
+        self.waited = 0
+
+    def wait(self):
+        self.waited += 1
+        if self.chunks is not None and self.waited >= self.chunks:
+            raise Interrupted
+
+
+class TestTenantPurge(FrappeTestCase):
+    def setUp(self):
+        self.names = sorted(
+            frappe.get_doc({"doctype": "ToDo", "description": f"Purge test {i}"}).insert().name
+            for i in range(5)
+        )
+        frappe.db.sql(
+            "UPDATE `tabToDo` SET tenant_id = %s WHERE name IN %s",
+            (TENANT_ID, tuple(self.names)))
+
+        frappe.conf.saas_purge_chunk_size = 2
+        self.addCleanup(frappe.conf.pop, "saas_purge_chunk_size", None)
+
+        # Checkpoints stay in the log, no Tenant row and no commit needed
+        progress = patch.object(tenant_purge, "set_purge_progress")
+        self.set_purge_progress = progress.start()
+        self.addCleanup(progress.stop)
+
+    def remaining(self):
+        return frappe.db.sql_list(
+            "SELECT name FROM `tabToDo` WHERE tenant_id = %s ORDER BY name", (TENANT_ID,))
+
+    def test_purge_table_deletes_in_chunks(self):
+        log = {"done": {}, "deleted": 0}
+        tenant_purge.purge_table("Test Tenant", TENANT_ID, "tabToDo", log, StopAfter())
+
+        self.assertEqual(self.remaining(), [])
+        self.assertEqual(log["done"]["tabToDo"], 5)
+        self.assertEqual(log["deleted"], 5)
+        self.assertNotIn("current", log)
+        # One checkpoint per chunk of 2, plus the final one
+        self.assertEqual(self.set_purge_progress.call_count, 4)
+
+    def test_purge_table_resumes_from_checkpoint(self):
+        log = {"done": {}, "deleted": 0}
+        with self.assertRaises(Interrupted):
+            tenant_purge.purge_table("Test Tenant", TENANT_ID, "tabToDo", log, StopAfter(1))
+
+        self.assertEqual(
+            log["current"], {"table": "tabToDo", "after": self.names[1], "deleted": 2})
+        self.assertEqual(self.remaining(), self.names[2:])
+
+        tenant_purge.purge_table("Test Tenant", TENANT_ID, "tabToDo", log, StopAfter())
+
+        self.assertEqual(self.remaining(), [])
+        self.assertEqual(log["done"]["tabToDo"], 5)
+        self.assertEqual(log["deleted"], 5)
+        self.assertNotIn("current", log)
+
+    def test_purge_table_keeps_other_tenants_rows(self):
+        other = frappe.get_doc({"doctype": "ToDo", "description": "Other tenant"}).insert().name
+        frappe.db.set_value("ToDo", other, "tenant_id", "OTHERTST", update_modified=False)
+
+        log = {"done": {}, "deleted": 0}
+        tenant_purge.purge_table("Test Tenant", TENANT_ID, "tabToDo", log, StopAfter())
+
+        self.assertTrue(frappe.db.exists("ToDo", other))
@@ -0,0 +1,84 @@
+# Copyright (c) 2025, Asofi and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+import jwt
+from frappe.tests.utils import FrappeTestCase
+
+from saas_platform.utils import tenant_token
+
+
+def decode(token, jwks):
+    """Verify a token the way a microservice does: pick the JWKS key by kid"""
+    kid = jwt.get_unverified_header(token)["kid"]
+    jwk = next(k for k in jwks["keys"] if k["kid"] == kid)
+    return jwt.decode(
+        token, jwt.PyJWK(jwk).key, algorithms=[tenant_token.ALGORITHM],
+        options={"verify_aud": False})
+
+
+class TestTenantToken(FrappeTestCase):
+    def setUp(self):
+        # Keys only in memory, the site's own keys and site_config stay untouched
+        for key in (tenant_token.PRIVATE_KEY_CONFIG, tenant_token.PREVIOUS_KEY_CONFIG):
+            self.addCleanup(self.restore_conf, key, frappe.local.conf.get(key))
+            frappe.local.conf.pop(key, None)
+        frappe.local.conf[tenant_token.PRIVATE_KEY_CONFIG] = tenant_token.generate_private_key()
+
+    def restore_conf(self, key, value):
+        if value is None:
+            frappe.local.conf.pop(key, None)
+        else:
+            frappe.local.conf[key] = value
+
+    def test_token_verifies_against_jwks(self):
+        token = tenant_token.issue_token(
+            "test@example.com", tenant_id="TOKENTST", tenant_status="Active")
+        claims = decode(token, tenant_token.get_public_jwks())
+
+        self.assertEqual(claims["sub"], "test@example.com")
+        self.assertEqual(claims["tenant_id"], "TOKENTST")
+        self.assertEqual(claims["tenant_status"], "Active")
+
+    def test_tampered_token_is_rejected(self):
+        token = tenant_token.issue_token(
+            "test@example.com", tenant_id="TOKENTST", tenant_status="Active")
+        header, payload, signature = token.split(".")
+        forged = jwt.encode(
+            {"sub": "test@example.com", "tenant_id": "OTHERTST"}, "secret",
+            algorithm="HS256").split(".")[1]
+
+        with self.assertRaises(jwt.InvalidSignatureError):
+            decode(f"{header}.{forged}.{signature}", tenant_token.get_public_jwks())
+
+    def test_expired_token_is_rejected(self):
+        with patch.object(tenant_token, "get_token_ttl", return_value=-1):
+            token = tenant_token.issue_token(
+                "test@example.com", tenant_id="TOKENTST", tenant_status="Active")
+
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            decode(token, tenant_token.get_public_jwks())
+
+    def test_previous_key_verifies_after_rotation(self):
+        token = tenant_token.issue_token(
+            "test@example.com", tenant_id="TOKENTST", tenant_status="Active")
+
+        # What rotate_signing_key does, without writing site_config
+        conf = frappe.local.conf
+        conf[tenant_token.PREVIOUS_KEY_CONFIG] = conf[tenant_token.PRIVATE_KEY_CONFIG]
+        conf[tenant_token.PRIVATE_KEY_CONFIG] = tenant_token.generate_private_key()
+
+        jwks = tenant_token.get_public_jwks()
+        self.assertEqual(len(jwks["keys"]), 2)
+        self.assertEqual(decode(token, jwks)["tenant_id"], "TOKENTST")
+
+        conf.pop(tenant_token.PREVIOUS_KEY_CONFIG)
+        with self.assertRaises(StopIteration):
+            decode(token, tenant_token.get_public_jwks())
+
+    def test_missing_key_throws(self):
+        frappe.local.conf.pop(tenant_token.PRIVATE_KEY_CONFIG)
+        with self.assertRaises(frappe.ValidationError):
+            tenant_token.issue_token("test@example.com", tenant_id="TOKENTST", tenant_status="Active")
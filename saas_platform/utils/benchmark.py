@@ -0,0 +1,353 @@
+"""
+Tenant isolation benchmark suite
+
+Generates a synthetic dataset of N tenants x M rows of ERPNext
+transaction and ledger DocTypes (Sales Invoice, GL Entry, Payment Ledger
+Entry; bulk inserted into the tenant_id column layout added by
+add_tenant_id_to_all_tables) and times the isolation hot paths at each
+tenant count:
+
+- list and report queries filtered by get_permission_query_conditions
+- permissions.has_permission checks on loaded documents
+- the before_insert hook (set_tenant_id) on new documents
+
+Results are written as JSON to sites/<site>/private/benchmarks/ so runs
+from different releases can be compared with compare_results.
+
+Usage:
+    bench --site dev.localhost execute saas_platform.utils.benchmark.run_benchmark
+    bench --site dev.localhost execute saas_platform.utils.benchmark.run_benchmark --kwargs "{'tenant_counts': [10, 100, 1000], 'rows_per_tenant': 200}"
+    bench --site dev.localhost execute saas_platform.utils.benchmark.compare_results --kwargs "{'baseline': 'a.json', 'current': 'b.json'}"
+"""
+import json
+import os
+import platform
+import random
+import time
+
+import frappe
+from frappe.utils import add_days, getdate, now, nowdate
+
+import saas_platform
+from saas_platform.permissions import has_permission
+from saas_platform.utils.stamping import has_tenant_column
+from saas_platform.utils.tenant import get_permission_query_conditions, set_tenant_id
+from saas_platform.utils.tenant_resolver import clear_user_tenant_cache
+from saas_platform.utils.tenant_session import SNAPSHOT_KEY
+
+TENANT_PREFIX = "BENCH"
+USER_DOMAIN = "bench.invalid"
+INSERT_BATCH_SIZE = 1000
+DEFAULT_TENANT_COUNTS = (10, 100)
+DEFAULT_ROWS_PER_TENANT = 100
+DEFAULT_ITERATIONS = 50
+DEFAULT_REGRESSION_THRESHOLD = 0.2  # 20% slower
+
+
+# ERPNext transaction and ledger DocTypes and how to fill their columns:
+# every tenant posts under its own company, like real tenants do
+DATASET_DOCTYPES = {
+    "Sales Invoice": lambda n, tenant: {
+        "naming_series": "ACC-SINV-.YYYY.-",
+        "customer": f"{tenant} Customer {n % 20}",
+        "company": f"{tenant} Ltd",
+        "posting_date": add_days(nowdate(), -random.randint(0, 365)),
+        "due_date": add_days(nowdate(), random.randint(0, 30)),
+        "currency": "USD",
+        "grand_total": random.randint(100, 100000) / 100,
+        "outstanding_amount": random.choice((0, random.randint(100, 100000) / 100)),
+        "status": random.choice(("Paid", "Unpaid", "Overdue")),
+        "docstatus": 1,
+    },
+    "GL Entry": lambda n, tenant: {
+        "posting_date": add_days(nowdate(), -random.randint(0, 365)),
+        "account": random.choice(("Debtors", "Sales", "Cash", "VAT")) + f" - {tenant}",
+        "company": f"{tenant} Ltd",
+        "voucher_type": "Sales Invoice",
+        "voucher_no": f"{tenant}-Sales Invoice-{n // 2}",
+        "debit": random.randint(0, 100000) / 100,
+        "credit": random.randint(0, 100000) / 100,
+        "fiscal_year": str(getdate(nowdate()).year),
+        "is_cancelled": 0,
+        "docstatus": 1,
+    },
+    "Payment Ledger Entry": lambda n, tenant: {
+        "posting_date": add_days(nowdate(), -random.randint(0, 365)),
+        "company": f"{tenant} Ltd",
+        "account": f"Debtors - {tenant}",
+        "party_type": "Customer",
+        "party": f"{tenant} Customer {n % 20}",
+        "voucher_type": "Sales Invoice",
+        "voucher_no": f"{tenant}-Sales Invoice-{n}",
+        "against_voucher_type": "Sales Invoice",
+        "against_voucher_no": f"{tenant}-Sales Invoice-{n}",
+        "amount": random.randint(100, 100000) / 100,
+        "account_currency": "USD",
+        "delinked": 0,
+        "docstatus": 1,
+    },
+}
+
+
+def run_benchmark(tenant_counts=None, rows_per_tenant=None, iterations=None,
+                  doctypes=None, keep_data=False):
+    """
+    Generate tenants incrementally and time the isolation paths at each count
+
+    Args:
+            tenant_counts: Tenant counts to measure at, ascending
+            rows_per_tenant: Rows per tenant per DocType
+            iterations: Timed calls per operation and DocType
+            doctypes: Subset of DATASET_DOCTYPES
+            keep_data: Leave the synthetic dataset in place afterwards
+
+    Returns:
+            dict: Benchmark result (also written to a JSON file)
+    """
+    tenant_counts = sorted(tenant_counts or DEFAULT_TENANT_COUNTS)
+    rows_per_tenant = rows_per_tenant or DEFAULT_ROWS_PER_TENANT
+    iterations = iterations or DEFAULT_ITERATIONS
+    doctypes = [
+        dt for dt in (doctypes or DATASET_DOCTYPES)
+        if frappe.db.table_exists(dt) and has_tenant_column(dt)
+    ]
+
+    result = {
+        "suite": "tenant_isolation",
+        "timestamp": now(),
+        "environment": get_environment(),
+        "parameters": {
+            "tenant_counts": tenant_counts,
+            "rows_per_tenant": rows_per_tenant,
+            "iterations": iterations,
+            "doctypes": doctypes,
+        },
+        "runs": [],
+    }
+
+    session_user = frappe.session.user
+    generated = 0
+    try:
+        for tenant_count in tenant_counts:
+            print(f"🔄 Generating tenants {generated + 1}-{tenant_count}...")
+            generate_dataset(generated, tenant_count, rows_per_tenant, doctypes)
+            generated = tenant_count
+            frappe.db.commit()
+
+            run = {"tenants": tenant_count, "rows": tenant_count * rows_per_tenant,
+                   "results": measure(tenant_count, doctypes, iterations)}
+            result["runs"].append(run)
+            print_run(run)
+    finally:
+        frappe.set_user(session_user)
+        # A failed batch must not be committed by the cleanup below
+        frappe.db.rollback()
+        if not keep_data:
+            cleanup_dataset(generated, doctypes)
+
+    path = write_result(result)
+    print(f"✅ Results written to {path}")
+    return result
+
+
+def generate_dataset(start, end, rows_per_tenant, doctypes):
+    """Bulk insert tenants [start, end) with one user and M rows per DocType each"""
+    timestamp = now()
+    audit = [timestamp, timestamp, "Administrator", "Administrator"]
+    audit_fields = ["creation", "modified", "owner", "modified_by"]
+
+    users = [
+        [get_user(i), get_user(i), f"Bench {i}", 1, "System User", get_tenant(i)] + audit
+        for i in range(start, end)
+    ]
+    frappe.db.bulk_insert(
+        "User",
+        ["name", "email", "first_name", "enabled", "user_type", "tenant_id"] + audit_fields,
+        users, ignore_duplicates=True)
+
+    for doctype in doctypes:
+        make_values = DATASET_DOCTYPES[doctype]
+        fieldnames = list(make_values(0, ""))
+        rows = []
+        for i in range(start, end):
+            for n in range(rows_per_tenant):
+                values = make_values(n, get_tenant(i))
+                rows.append([f"{get_tenant(i)}-{doctype}-{n}", get_tenant(i)]
+                            + [values[f] for f in fieldnames] + audit)
+                if len(rows) >= INSERT_BATCH_SIZE:
+                    insert_rows(doctype, fieldnames, audit_fields, rows)
+                    rows = []
+        insert_rows(doctype, fieldnames, audit_fields, rows)
+
+
+def insert_rows(doctype, fieldnames, audit_fields, rows):
+    if rows:
+        frappe.db.bulk_insert(
+            doctype, ["name", "tenant_id"] + fieldnames + audit_fields, rows,
+            ignore_duplicates=True)
+
+
+def measure(tenant_count, doctypes, iterations):
+    """Time each isolation path for users of randomly picked tenants"""
+    results = {}
+    for doctype in doctypes:
+        table = f"`tab{doctype}`"
+        timings = {"list_query": [], "report_query": [],
+                   "has_permission": [], "before_insert": []}
+
+        for _ in range(iterations):
+            user = get_user(random.randrange(tenant_count))
+            start_request(user)
+
+            started = time.perf_counter()
+            conditions = get_permission_query_conditions(user, doctype)
+            names = frappe.db.sql(f"""
+                SELECT name FROM {table} WHERE {conditions}
+                ORDER BY modified DESC LIMIT 20
+            """, pluck=True)
+            timings["list_query"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            conditions = get_permission_query_conditions(user, doctype)
+            frappe.db.sql(f"""
+                SELECT COUNT(*), MIN(modified), MAX(modified)
+                FROM {table} WHERE {conditions}
+            """)
+            timings["report_query"].append(time.perf_counter() - started)
+
+            if names:
+                doc = frappe.get_doc(doctype, random.choice(names))
+                start_request(user)
+                started = time.perf_counter()
+                has_permission(doc, "read", user)
+                timings["has_permission"].append(time.perf_counter() - started)
+
+            doc = frappe.new_doc(doctype)
+            start_request(user)
+            started = time.perf_counter()
+            set_tenant_id(doc)
+            timings["before_insert"].append(time.perf_counter() - started)
+
+        results[doctype] = {
+            operation: summarize(samples)
+            for operation, samples in timings.items() if samples
+        }
+    return results
+
+
+def start_request(user):
+    """Reset per-request state so every timed call sees a fresh request"""
+    frappe.set_user(user)
+    frappe.local.saas_user_tenant_ids = {}
+    # set_user keeps top-level session keys, get_tenant_id would reuse the first user's
+    frappe.session.pop("tenant_id", None)
+    frappe.session.data.pop(SNAPSHOT_KEY, None)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(1000 * sum(samples) / len(samples), 4),
+        "p50_ms": round(1000 * percentile(samples, 50), 4),
+        "p95_ms": round(1000 * percentile(samples, 95), 4),
+        "max_ms": round(1000 * samples[-1], 4),
+    }
+
+
+def percentile(sorted_samples, pct):
+    index = round(pct / 100 * (len(sorted_samples) - 1))
+    return sorted_samples[index]
+
+
+def cleanup_dataset(tenant_count, doctypes):
+    """Delete the synthetic tenants, their users and rows"""
+    if not tenant_count:
+        return
+
+    print("🧹 Removing benchmark data...")
+    # Only the generated ids - a prefix match would also hit real tenants
+    for start in range(0, tenant_count, INSERT_BATCH_SIZE):
+        batch = range(start, min(start + INSERT_BATCH_SIZE, tenant_count))
+        tenants = tuple(get_tenant(i) for i in batch)
+        for doctype in doctypes:
+            frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE tenant_id IN %s", (tenants,))
+        frappe.db.sql("DELETE FROM `tabUser` WHERE name IN %s",
+                      (tuple(get_user(i) for i in batch),))
+    frappe.db.commit()
+
+    for i in range(tenant_count):
+        clear_user_tenant_cache(get_user(i))
+
+
+def get_tenant(i):
+    return f"{TENANT_PREFIX}{i:06d}"
+
+
+def get_user(i):
+    return f"user{i}@{USER_DOMAIN}"
+
+
+def get_environment():
+    return {
+        "saas_platform": saas_platform.__version__,
+        "frappe": frappe.__version__,
+        "database": frappe.db.sql("SELECT VERSION()")[0][0],
+        "python": platform.python_version(),
+        "site": frappe.local.site,
+    }
+
+
+def write_result(result):
+    folder = frappe.get_site_path("private", "benchmarks")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(
+        folder, f"{result['suite']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=1)
+    return path
+
+
+def compare_results(baseline, current, threshold=None):
+    """
+    Compare two result files and report p95 regressions
+
+    Args:
+            baseline: Path to the baseline JSON
+            current: Path to the new JSON
+            threshold: Relative slowdown that counts as a regression
+
+    Returns:
+            list: Regressions as dicts (tenants, doctype, operation, baseline, current)
+    """
+    threshold = DEFAULT_REGRESSION_THRESHOLD if threshold is None else threshold
+    with open(baseline) as f:
+        baseline = {run["tenants"]: run["results"] for run in json.load(f)["runs"]}
+    with open(current) as f:
+        current = {run["tenants"]: run["results"] for run in json.load(f)["runs"]}
+
+    regressions = []
+    for tenants, results in current.items():
+        for doctype, operations in results.items():
+            for operation, stats in operations.items():
+                before = baseline.get(tenants, {}).get(doctype, {}).get(operation)
+                if before and stats["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                    regressions.append({
+                        "tenants": tenants, "doctype": doctype, "operation": operation,
+                        "baseline_p95_ms": before["p95_ms"], "current_p95_ms": stats["p95_ms"],
+                    })
+
+    for r in regressions:
+        print(f"❌ {r['tenants']} tenants, {r['doctype']} {r['operation']}: "
+              f"p95 {r['baseline_p95_ms']}ms -> {r['current_p95_ms']}ms")
+    if not regressions:
+        print("✅ No regressions")
+    return regressions
+
+
+def print_run(run):
+    print(f"\n=== {run['tenants']} tenants ({run['rows']} rows per DocType) ===")
+    for doctype, operations in run["results"].items():
+        for operation, stats in operations.items():
+            print(f"  {doctype:<20} {operation:<15} p50 {stats['p50_ms']:>9.3f}ms"
+                  f"  p95 {stats['p95_ms']:>9.3f}ms")
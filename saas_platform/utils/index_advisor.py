@@ -0,0 +1,239 @@
+"""
+Composite tenant index advisor
+
+Proposes and creates composite indexes that start with tenant_id, based
+on how list views query each DocType (sort field, standard filters,
+docstatus and Company links), so tenant-scoped list queries avoid
+filesorts over the whole tenant slice.
+
+Usage:
+    bench --site dev.localhost execute saas_platform.utils.index_advisor.build_composite_indexes
+    bench --site dev.localhost execute saas_platform.utils.index_advisor.build_composite_indexes --kwargs "{'dry_run': True}"
+"""
+
+import hashlib
+
+import frappe
+
+DEFAULT_MIN_ROWS = 10000
+MAX_INDEXES_PER_TABLE = 4
+
+# Field types whose columns make useful index prefixes
+INDEXABLE_FIELDTYPES = frozenset([
+    'Link', 'Select', 'Data', 'Date', 'Datetime', 'Check', 'Int',
+    'Dynamic Link'
+])
+
+
+def propose_indexes(doctype):
+    """
+    Propose composite tenant indexes for a DocType
+
+    Args:
+            doctype: DocType name
+
+    Returns:
+            list: Column tuples, each starting with tenant_id
+    """
+    meta = frappe.get_meta(doctype)
+    if meta.issingle or meta.is_virtual:
+        return []
+
+    table_columns = set(frappe.db.get_table_columns(doctype))
+    if "tenant_id" not in table_columns:
+        return []
+
+    sort_field = meta.sort_field or "modified"
+    if sort_field not in table_columns:
+        sort_field = "modified"
+
+    candidates = [("tenant_id", sort_field)]
+
+    if meta.is_submittable:
+        candidates.append(("tenant_id", "docstatus", sort_field))
+
+    for df in meta.fields:
+        if df.fieldtype == "Link" and df.options == "Company":
+            candidates.append(("tenant_id", df.fieldname, sort_field))
+        elif df.in_standard_filter and df.fieldtype in INDEXABLE_FIELDTYPES:
+            candidates.append(("tenant_id", df.fieldname))
+
+    existing = get_existing_indexes(f"tab{doctype}")
+    proposals = []
+    for columns in candidates:
+        if not all(c in table_columns for c in columns):
+            continue
+        if columns in proposals or is_covered(columns, existing.values()):
+            continue
+        proposals.append(columns)
+
+    return proposals[:MAX_INDEXES_PER_TABLE]
+
+
+def build_composite_indexes(doctypes=None, min_rows=None, dry_run=False):
+    """
+    Create proposed composite indexes on large tenant-scoped tables
+
+    Args:
+            doctypes: Optional list of DocTypes, defaults to every table
+                      with a tenant_id column and at least min_rows rows
+            min_rows: Row threshold (site_config `saas_index_advisor_min_rows`)
+            dry_run: Only report what would be created
+
+    Returns:
+            dict: {"added": [...], "proposed": [...], "errors": [...]}
+    """
+    if min_rows is None:
+        min_rows = frappe.conf.get(
+            "saas_index_advisor_min_rows") or DEFAULT_MIN_ROWS
+
+    if not doctypes:
+        doctypes = get_large_tenant_doctypes(min_rows)
+
+    result = {"added": [], "proposed": [], "errors": []}
+
+    for doctype in doctypes:
+        try:
+            for columns in propose_indexes(doctype):
+                index_name = get_index_name(columns)
+                entry = {"doctype": doctype, "index": index_name,
+                         "columns": list(columns)}
+                if dry_run:
+                    result["proposed"].append(entry)
+                    continue
+
+                frappe.db.add_index(doctype, list(columns), index_name)
+                result["added"].append(entry)
+        except Exception as e:
+            result["errors"].append({"doctype": doctype, "error": str(e)})
+
+    if result["added"]:
+        sizes = get_index_sizes([f"tab{e['doctype']}" for e in result["added"]])
+        for entry in result["added"]:
+            entry["size_mb"] = sizes.get((f"tab{entry['doctype']}", entry["index"]))
+
+    print_report(result)
+    return result
+
+
+def get_large_tenant_doctypes(min_rows):
+    """DocTypes with a tenant_id column and at least min_rows (estimated) rows"""
+    tables = frappe.db.sql_list("""
+        SELECT t.TABLE_NAME
+        FROM information_schema.TABLES t
+        JOIN information_schema.COLUMNS c
+            ON c.TABLE_SCHEMA = t.TABLE_SCHEMA
+            AND c.TABLE_NAME = t.TABLE_NAME
+            AND c.COLUMN_NAME = 'tenant_id'
+        WHERE t.TABLE_SCHEMA = DATABASE()
+            AND t.TABLE_NAME LIKE 'tab%%'
+            AND t.TABLE_ROWS >= %s
+        ORDER BY t.TABLE_ROWS DESC
+    """, (min_rows,))
+    return [table[3:] for table in tables]
+
+
+def get_existing_indexes(table_name):
+    """
+    Returns:
+            dict: index name -> tuple of columns in index order
+    """
+    indexes = {}
+    for row in frappe.db.sql(f"SHOW INDEX FROM `{table_name}`", as_dict=True):
+        indexes.setdefault(row.Key_name, []).append(
+            (row.Seq_in_index, row.Column_name))
+
+    return {name: tuple(c for _, c in sorted(cols))
+            for name, cols in indexes.items()}
+
+
+def is_covered(columns, existing_indexes):
+    """True if an existing index already has `columns` as its leftmost prefix"""
+    return any(index[:len(columns)] == columns for index in existing_indexes)
+
+
+def get_index_name(columns):
+    name = "_".join(columns) + "_index"
+    if len(name) <= 64:
+        return name
+
+    # MariaDB identifiers are limited to 64 characters; the hash keeps
+    # names that share a long prefix apart
+    digest = hashlib.sha1(name.encode()).hexdigest()[:8]
+    return f"{name[:55]}_{digest}"
+
+
+def get_index_sizes(tables):
+    """
+    Index sizes from InnoDB persistent statistics
+
+    mysql.innodb_index_stats needs SELECT on the mysql schema, which site
+    database users usually lack; sizes are then unknown (missing from
+    the result) instead of failing the caller.
+
+    Returns:
+            dict: (table, index) -> size in MB
+    """
+    if not tables:
+        return {}
+
+    try:
+        rows = frappe.db.sql("""
+            SELECT table_name, index_name,
+                ROUND(stat_value * @@innodb_page_size / 1024 / 1024, 2) AS size_mb
+            FROM mysql.innodb_index_stats
+            WHERE database_name = DATABASE()
+                AND stat_name = 'size'
+                AND table_name IN %s
+        """, (tuple(set(tables)),), as_dict=True)
+    except Exception as e:
+        frappe.log_error(f"Index sizes unavailable: {str(e)}", "Index Advisor")
+        return {}
+
+    return {(r.table_name, r.index_name): r.size_mb for r in rows}
+
+
+def get_index_report(doctypes=None):
+    """
+    Report all tenant_id-leading indexes with their sizes
+
+    Returns:
+            list: [{"doctype", "index", "columns", "size_mb"}], size_mb
+                  None when the sizes cannot be read
+    """
+    doctypes = doctypes or get_large_tenant_doctypes(0)
+    tables = [f"tab{d}" for d in doctypes]
+    sizes = get_index_sizes(tables)
+
+    report = []
+    for table_name in tables:
+        for index_name, columns in get_existing_indexes(table_name).items():
+            if columns[0] != "tenant_id":
+                continue
+            report.append({
+                "doctype": table_name[3:],
+                "index": index_name,
+                "columns": list(columns),
+                "size_mb": sizes.get((table_name, index_name)),
+            })
+
+    return report
+
+
+def print_report(result):
+    print("\n" + "=" * 70)
+    print("COMPOSITE TENANT INDEXES")
+    print("=" * 70)
+    for entry in result["added"]:
+        print(f"✅ {entry['doctype']}: {entry['index']} "
+              f"({', '.join(entry['columns'])}) {format_size(entry.get('size_mb'))}")
+    for entry in result["proposed"]:
+        print(f"💡 {entry['doctype']}: {entry['index']} "
+              f"({', '.join(entry['columns'])})")
+    for entry in result["errors"]:
+        print(f"❌ {entry['doctype']}: {entry['error']}")
+    print("=" * 70)
+
+
+def format_size(size_mb):
+    return "size unknown" if size_mb is None else f"{size_mb} MB"
@@ -0,0 +1,81 @@
+"""Unique name / abbreviation / ID allocation for tenant onboarding"""
+import random
+import re
+import string
+
+import frappe
+
+RESERVATION_PREFIX = "saas_platform:name_reservation"
+RESERVATION_TTL = 300  # seconds, long enough for the insert to commit
+RANDOM_ID_BATCH = 10
+
+
+def allocate_unique_value(doctype, base, fieldname="name", separator=" "):
+    """
+    Find the first free value among `base`, `base 1`, `base 2`, ...
+
+    Existing values are read with a single prefix query and the chosen
+    value is reserved in Redis, so concurrent signups cannot pick the
+    same one before either has committed.
+
+    Args:
+            doctype: DocType to check
+            base: Preferred value
+            fieldname: Column holding the value
+            separator: Put between base and the numeric suffix
+
+    Returns:
+            str: Free, reserved value
+    """
+    existing = frappe.db.sql_list(f"""
+        SELECT `{fieldname}` FROM `tab{doctype}`
+        WHERE `{fieldname}` LIKE %s
+    """, (escape_like(base) + "%",))
+
+    # Names compare case-insensitively in MariaDB's default collation
+    pattern = re.compile(
+        rf"^{re.escape(base)}(?:{re.escape(separator)}(\d+))?$", re.IGNORECASE)
+    used = set()
+    for value in existing:
+        match = pattern.match(value or "")
+        if match:
+            used.add(int(match.group(1) or 0))
+
+    counter = 0
+    while True:
+        if counter not in used:
+            candidate = f"{base}{separator}{counter}" if counter else base
+            if reserve(doctype, fieldname, candidate):
+                return candidate
+        counter += 1
+
+
+def allocate_random_id(doctype, fieldname, length=8):
+    """
+    Allocate a random uppercase alphanumeric ID not yet used in `fieldname`
+
+    Checks a batch of candidates per query instead of one query per try.
+    """
+    while True:
+        candidates = [
+            ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
+            for _ in range(RANDOM_ID_BATCH)
+        ]
+        taken = set(frappe.get_all(
+            doctype, filters={fieldname: ["in", candidates]}, pluck=fieldname))
+
+        for candidate in candidates:
+            if candidate not in taken and reserve(doctype, fieldname, candidate):
+                return candidate
+
+
+def reserve(doctype, fieldname, value):
+    """Atomically reserve a value (Redis SET NX); False if already reserved"""
+    cache = frappe.cache()
+    key = cache.make_key(
+        f"{RESERVATION_PREFIX}:{doctype}:{fieldname}:{value.lower()}")
+    return bool(cache.set(key, 1, nx=True, ex=RESERVATION_TTL))
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,143 @@
+"""
+Tenant change outbox
+
+Tenant and membership changes are appended to `Tenant Change Event` in
+the same transaction as the change itself, so an event exists if and
+only if the change committed. Downstream services pull events in order
+with a cursor (the autoincrement id) and invalidate their caches.
+
+Events are buffered per transaction and inserted in a before_commit
+callback, so ids are taken right before COMMIT: however long the
+transaction ran, only the commit itself separates the id from its
+visibility, which the consumers' visibility delay covers. Code that
+rolls back to a savepoint uses `savepoint` / `rollback_to_savepoint`
+from here, so events emitted after the savepoint are dropped with it.
+"""
+import json
+
+import frappe
+from frappe.utils import now
+
+OUTBOX_DOCTYPE = "Tenant Change Event"
+DEFAULT_VISIBILITY_DELAY = 5  # seconds
+MAX_BATCH_SIZE = 1000
+
+
+def emit_event(event_type, tenant_id, user=None, payload=None):
+    """Append one change event in the current transaction"""
+    emit_events([{
+        "event_type": event_type,
+        "tenant_id": tenant_id,
+        "user": user,
+        "payload": payload,
+    }])
+
+
+def emit_events(events):
+    """
+    Append many change events to the current transaction
+
+    They are written with a single INSERT right before it commits and
+    dropped if it rolls back.
+
+    Args:
+            events: List of dicts with event_type, tenant_id, user, payload
+    """
+    if not events:
+        return
+
+    pending = getattr(frappe.local, "saas_outbox_pending", None)
+    if pending is None:
+        pending = frappe.local.saas_outbox_pending = []
+        frappe.db.before_commit.add(insert_pending_events)
+        frappe.db.after_rollback.add(discard_pending_events)
+
+    pending.extend(
+        (e["event_type"], e["tenant_id"], e.get("user"),
+         json.dumps(e.get("payload") or {}, default=str), frappe.session.user)
+        for e in events
+    )
+
+
+def insert_pending_events():
+    """before_commit: insert the transaction's events"""
+    pending = frappe.local.saas_outbox_pending
+    frappe.local.saas_outbox_pending = None
+    frappe.local.saas_outbox_savepoints = None
+    if not pending:
+        return
+
+    # Creation is the insert time, right before commit
+    timestamp = now()
+    fields = ["event_type", "tenant_id", "user", "payload",
+              "creation", "modified", "owner", "modified_by"]
+    frappe.db.bulk_insert(OUTBOX_DOCTYPE, fields, [
+        (event_type, tenant_id, user, payload, timestamp, timestamp, owner, owner)
+        for event_type, tenant_id, user, payload, owner in pending
+    ])
+
+
+def discard_pending_events():
+    frappe.local.saas_outbox_pending = None
+    frappe.local.saas_outbox_savepoints = None
+
+
+def savepoint(name):
+    """frappe.db.savepoint that also marks how many events are pending"""
+    frappe.db.savepoint(name)
+
+    savepoints = getattr(frappe.local, "saas_outbox_savepoints", None)
+    if savepoints is None:
+        savepoints = frappe.local.saas_outbox_savepoints = {}
+    savepoints[name] = len(getattr(frappe.local, "saas_outbox_pending", None) or [])
+
+
+def rollback_to_savepoint(name):
+    """
+    frappe.db.rollback(save_point=name) that also drops the events
+    emitted since the savepoint; frappe runs no callbacks for it
+    """
+    frappe.db.rollback(save_point=name)
+
+    mark = (getattr(frappe.local, "saas_outbox_savepoints", None) or {}).get(name)
+    pending = getattr(frappe.local, "saas_outbox_pending", None)
+    if pending and mark is not None:
+        del pending[mark:]
+
+
+def get_events(after=0, limit=500):
+    """
+    Pull events after a cursor
+
+    Events younger than a few seconds are held back so that a transaction
+    that took an earlier id but was still committing is not skipped by
+    consumers (ids are taken right before commit, see emit_events).
+
+    Args:
+            after: Last event id the consumer has processed
+            limit: Max events to return
+
+    Returns:
+            dict: {"events": [...], "cursor": last id returned (or `after`)}
+    """
+    after = int(after or 0)
+    limit = min(int(limit or 500), MAX_BATCH_SIZE)
+    delay = int(frappe.conf.get(
+        "saas_outbox_visibility_delay", DEFAULT_VISIBILITY_DELAY))
+
+    events = frappe.db.sql(f"""
+        SELECT name AS id, event_type, tenant_id, user, payload, creation
+        FROM `tab{OUTBOX_DOCTYPE}`
+        WHERE name > %s
+            AND creation <= NOW() - INTERVAL %s SECOND
+        ORDER BY name
+        LIMIT %s
+    """, (after, delay, limit), as_dict=True)
+
+    for event in events:
+        event.payload = json.loads(event.payload or "{}")
+
+    return {
+        "events": events,
+        "cursor": events[-1].id if events else after,
+    }
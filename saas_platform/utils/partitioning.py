@@ -0,0 +1,318 @@
+"""
+Tenant partitioning for large tables
+
+Converts high-volume tables to partitioning on tenant_id so that
+tenant-filtered queries (`tenant_id IN ('<tenant>', 'SYSTEM')`) are
+pruned to the tenant's partitions instead of walking one shared B-tree.
+
+Two layouts are supported:
+
+- key:  PARTITION BY KEY(tenant_id) PARTITIONS n - tenants are hashed
+        into a fixed number of partitions (default)
+- list: PARTITION BY LIST COLUMNS(tenant_id) - SYSTEM and every large
+        tenant get a dedicated partition, everyone else shares `p_default`
+
+MariaDB requires every unique key to contain the partitioning column, so
+the primary key becomes (name, tenant_id); `name` stays the leading
+column, so lookups by name still use it but check every partition.
+Tables with other unique or FULLTEXT indexes are skipped. Repartitioning
+copies the table and blocks writes while it runs - use a maintenance
+window.
+
+Config (site_config.json):
+    saas_partition_tables           candidate DocTypes (default: GL Entry,
+                                    Stock Ledger Entry)
+    saas_partition_min_rows         only partition candidates this large
+                                    (default 1000000)
+    saas_partition_method           "key" or "list" (default "key")
+    saas_partition_count            partitions for "key" (default 16)
+    saas_partition_tenant_min_rows  rows for a dedicated "list" partition
+                                    (default 100000)
+
+Usage:
+    bench --site dev.localhost execute saas_platform.utils.partitioning.partition_large_tables
+    bench --site dev.localhost execute saas_platform.utils.partitioning.print_report
+    bench --site dev.localhost execute saas_platform.utils.partitioning.rebalance --kwargs "{'doctype': 'GL Entry'}"
+    bench --site dev.localhost execute saas_platform.utils.partitioning.add_tenant_partition --kwargs "{'doctype': 'GL Entry', 'tenant_id': 'a1b2c3d4'}"
+"""
+
+import re
+
+import frappe
+
+from saas_platform.utils.tenant_migration import alter_table_online
+
+# Version is unstamped (always SYSTEM), partitioning it by tenant_id prunes nothing
+DEFAULT_TABLES = ("GL Entry", "Stock Ledger Entry")
+DEFAULT_MIN_ROWS = 1000000
+DEFAULT_METHOD = "key"
+DEFAULT_PARTITION_COUNT = 16
+DEFAULT_TENANT_MIN_ROWS = 100000
+DEFAULT_PARTITION = "p_default"
+
+
+def partition_large_tables(method=None, dry_run=False):
+    """
+    Partition every configured table above the row threshold
+
+    Args:
+            method: "key" or "list", defaults to saas_partition_method
+            dry_run: Only print what would be partitioned
+
+    Returns:
+            list: DocTypes partitioned (or that would be)
+    """
+    method = method or get_method()
+    candidates = get_candidate_tables()
+    print(f"\n📋 {len(candidates)} tables to partition by {method.upper()}(tenant_id)")
+
+    partitioned = []
+    for doctype, rows in candidates:
+        print(f"   🔄 {doctype} ({rows} rows)")
+        if dry_run:
+            partitioned.append(doctype)
+            continue
+        try:
+            partition_table(doctype, method)
+            partitioned.append(doctype)
+            print(f"   ✅ {doctype}")
+        except Exception as e:
+            print(f"   ❌ {doctype}: {str(e)}")
+            frappe.log_error(f"Failed to partition {doctype}: {str(e)}", "Tenant Partitioning")
+
+    return partitioned
+
+
+def get_candidate_tables():
+    """
+    Configured tables with a tenant_id column, at or above the row threshold,
+    not partitioned yet and without indexes that block partitioning
+
+    Returns:
+            list: (doctype, approximate rows), largest first
+    """
+    doctypes = frappe.conf.get("saas_partition_tables") or DEFAULT_TABLES
+    min_rows = frappe.conf.get("saas_partition_min_rows", DEFAULT_MIN_ROWS)
+    if not doctypes:
+        return []
+
+    tables = frappe.db.sql("""
+        SELECT t.TABLE_NAME, t.TABLE_ROWS, t.CREATE_OPTIONS
+        FROM information_schema.TABLES t
+        JOIN information_schema.COLUMNS c
+            ON c.TABLE_SCHEMA = t.TABLE_SCHEMA
+            AND c.TABLE_NAME = t.TABLE_NAME
+            AND c.COLUMN_NAME = 'tenant_id'
+        WHERE t.TABLE_SCHEMA = DATABASE()
+            AND t.TABLE_NAME IN %s
+            AND t.TABLE_ROWS >= %s
+        ORDER BY t.TABLE_ROWS DESC
+    """, (tuple(f"tab{dt}" for dt in doctypes), min_rows))
+
+    candidates = []
+    for table_name, rows, options in tables:
+        doctype = table_name[3:]
+        if "partitioned" in (options or ""):
+            continue
+        blocking = get_blocking_indexes(table_name)
+        if blocking:
+            print(f"   ⏭️  {doctype}: skipped, indexes {', '.join(blocking)} block partitioning")
+            continue
+        candidates.append((doctype, rows))
+
+    return candidates
+
+
+def get_blocking_indexes(table_name):
+    """Unique indexes (other than the primary key) and FULLTEXT indexes"""
+    return frappe.db.sql_list("""
+        SELECT DISTINCT INDEX_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = %s
+            AND INDEX_NAME != 'PRIMARY'
+            AND (NON_UNIQUE = 0 OR INDEX_TYPE = 'FULLTEXT')
+    """, table_name)
+
+
+def partition_table(doctype, method=None, partitions=None):
+    """
+    Partition one table on tenant_id
+
+    Args:
+            doctype: DocType name
+            method: "key" or "list"
+            partitions: Partition count for "key"
+    """
+    method = method or get_method()
+    table_name = f"tab{doctype}"
+
+    primary_key = frappe.db.sql_list("""
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'PRIMARY'
+        ORDER BY SEQ_IN_INDEX
+    """, table_name)
+    if "tenant_id" not in primary_key:
+        alter_table_online(table_name, [
+            "DROP PRIMARY KEY",
+            "ADD PRIMARY KEY (`name`, `tenant_id`)",
+        ])
+
+    if method == "list":
+        clause = build_list_partitions(["SYSTEM"] + get_large_tenants(doctype))
+    else:
+        clause = f"PARTITION BY KEY(tenant_id) PARTITIONS {int(partitions or get_partition_count())}"
+
+    frappe.db.sql_ddl(f"ALTER TABLE `{table_name}` {clause}")
+
+
+def build_list_partitions(tenant_ids):
+    partitions = [
+        f"PARTITION {get_partition_name(tenant_id)} VALUES IN ({frappe.db.escape(tenant_id)})"
+        for tenant_id in tenant_ids
+    ]
+    partitions.append(f"PARTITION {DEFAULT_PARTITION} DEFAULT")
+    return f"PARTITION BY LIST COLUMNS(tenant_id) ({', '.join(partitions)})"
+
+
+def get_large_tenants(doctype, partition=None):
+    """
+    Tenants with at least saas_partition_tenant_min_rows rows in a table
+
+    Args:
+            doctype: DocType name
+            partition: Only count rows in this partition
+
+    Returns:
+            list: tenant_ids, largest first
+    """
+    min_rows = frappe.conf.get("saas_partition_tenant_min_rows", DEFAULT_TENANT_MIN_ROWS)
+    source = f"`tab{doctype}`" + (f" PARTITION ({partition})" if partition else "")
+    return frappe.db.sql_list(f"""
+        SELECT tenant_id FROM {source}
+        WHERE tenant_id != 'SYSTEM'
+        GROUP BY tenant_id
+        HAVING COUNT(*) >= %s
+        ORDER BY COUNT(*) DESC
+    """, min_rows)
+
+
+def add_tenant_partition(doctype, tenant_id):
+    """
+    Give a tenant its own partition in a LIST partitioned table
+
+    Moves the tenant's rows out of the shared default partition.
+    """
+    if get_partition_method(doctype) != "LIST COLUMNS":
+        frappe.throw(f"{doctype} is not LIST partitioned on tenant_id")
+
+    name = get_partition_name(tenant_id)
+    if name in get_partition_names(doctype):
+        return
+
+    frappe.db.sql_ddl(f"""
+        ALTER TABLE `tab{doctype}` REORGANIZE PARTITION {DEFAULT_PARTITION} INTO (
+            PARTITION {name} VALUES IN ({frappe.db.escape(tenant_id)}),
+            PARTITION {DEFAULT_PARTITION} DEFAULT
+        )
+    """)
+
+
+def rebalance(doctype, partitions=None):
+    """
+    Rebalance a partitioned table
+
+    KEY tables are resized to `partitions` (default saas_partition_count);
+    LIST tables get dedicated partitions for tenants in the default
+    partition that have grown past saas_partition_tenant_min_rows.
+
+    Returns:
+            list: Partitions added
+    """
+    method = get_partition_method(doctype)
+    table_name = f"tab{doctype}"
+
+    if method == "KEY":
+        current = len(get_partition_names(doctype))
+        target = int(partitions or get_partition_count())
+        if target > current:
+            frappe.db.sql_ddl(
+                f"ALTER TABLE `{table_name}` ADD PARTITION PARTITIONS {target - current}")
+        elif target < current:
+            frappe.db.sql_ddl(
+                f"ALTER TABLE `{table_name}` COALESCE PARTITION {current - target}")
+        print(f"✅ {doctype}: {current} -> {target} partitions")
+        return []
+
+    if method == "LIST COLUMNS":
+        added = []
+        for tenant_id in get_large_tenants(doctype, partition=DEFAULT_PARTITION):
+            add_tenant_partition(doctype, tenant_id)
+            added.append(get_partition_name(tenant_id))
+            print(f"✅ {doctype}: dedicated partition for {tenant_id}")
+        return added
+
+    frappe.throw(f"{doctype} is not partitioned on tenant_id")
+
+
+def get_partition_report(doctype=None):
+    """
+    Partitions of tenant-partitioned tables with their approximate sizes
+
+    Returns:
+            list: dicts with table, partition, method, values, rows, data_mb, index_mb
+    """
+    conditions = "AND TABLE_NAME = %(table_name)s" if doctype else ""
+    return frappe.db.sql(f"""
+        SELECT TABLE_NAME AS `table`,
+            PARTITION_NAME AS `partition`,
+            PARTITION_METHOD AS method,
+            PARTITION_DESCRIPTION AS `values`,
+            TABLE_ROWS AS `rows`,
+            ROUND(DATA_LENGTH / 1024 / 1024, 2) AS data_mb,
+            ROUND(INDEX_LENGTH / 1024 / 1024, 2) AS index_mb
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+            AND PARTITION_NAME IS NOT NULL
+            AND PARTITION_EXPRESSION LIKE '%%tenant_id%%'
+            {conditions}
+        ORDER BY TABLE_NAME, PARTITION_ORDINAL_POSITION
+    """, {"table_name": f"tab{doctype}"}, as_dict=True)
+
+
+def print_report(doctype=None):
+    current_table = None
+    for row in get_partition_report(doctype):
+        if row.table != current_table:
+            current_table = row.table
+            print(f"\n=== {row.table} ({row.method}) ===")
+        print(f"  {row.partition:<24} {row['values'] or '':<16} "
+              f"{row.rows:>12} rows  {row.data_mb:>10} MB data  {row.index_mb:>10} MB index")
+
+
+def get_partition_method(doctype):
+    return frappe.db.sql("""
+        SELECT PARTITION_METHOD FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        LIMIT 1
+    """, f"tab{doctype}")[0][0]
+
+
+def get_partition_names(doctype):
+    return frappe.db.sql_list("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            AND PARTITION_NAME IS NOT NULL
+    """, f"tab{doctype}")
+
+
+def get_partition_name(tenant_id):
+    return "p_" + re.sub(r"[^0-9a-zA-Z_]", "_", tenant_id)[:60]
+
+
+def get_method():
+    return frappe.conf.get("saas_partition_method") or DEFAULT_METHOD
+
+
+def get_partition_count():
+    return frappe.conf.get("saas_partition_count") or DEFAULT_PARTITION_COUNT
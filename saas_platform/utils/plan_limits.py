@@ -0,0 +1,144 @@
+"""Cached tenant_id -> Plan limits lookup and insert-time enforcement"""
+import frappe
+
+from saas_platform.utils.tenant_session import get_session_snapshot
+from saas_platform.utils.usage import get_document_usage
+
+LIMITS_CACHE_KEY = "saas_platform:tenant_limits"
+DEFAULT_PLAN = "Free Plan"
+MAX_PLAN_LIMITS = 256
+
+# (site, plan, limits_version) -> limits, for sessions carrying a snapshot
+_plan_limits = {}
+
+# Plan fields copied into the cached limits
+LIMIT_FIELDS = (
+    "max_users", "max_storage_gb", "max_api_calls_per_day",
+    "api_requests_per_minute", "max_concurrent_requests",
+)
+
+
+class TenantLimitExceededError(frappe.ValidationError):
+    pass
+
+
+def get_tenant_limits(tenant_id):
+    """
+    Limits of the tenant's Plan, cached in Redis per tenant
+
+    Args:
+            tenant_id: Tenant ID
+
+    Returns:
+            dict: {"plan": name, <limit field>: int, ...,
+                   "document_limits": {doctype: max}}, empty for SYSTEM
+                  or unknown tenants (no limits). 0 / -1 means unlimited.
+    """
+    if not tenant_id or tenant_id == "SYSTEM":
+        return {}
+
+    # The session snapshot names the plan and its version: no lookup at all
+    snapshot = get_session_snapshot()
+    if snapshot and snapshot.get("tenant_id") == tenant_id and snapshot.get("plan"):
+        return get_plan_limits(snapshot["plan"], snapshot.get("limits_version"))
+
+    limits = frappe.cache().hget(LIMITS_CACHE_KEY, tenant_id)
+    if limits is None:
+        limits = build_tenant_limits(tenant_id)
+        frappe.cache().hset(LIMITS_CACHE_KEY, tenant_id, limits)
+    return limits
+
+
+def build_tenant_limits(tenant_id):
+    tenant = frappe.db.get_value(
+        "Tenant", {"tenant_id": tenant_id}, ["name", "plan"], as_dict=True)
+    if not tenant:
+        return {}
+
+    return build_plan_limits(
+        tenant.plan or frappe.conf.get("saas_default_plan") or DEFAULT_PLAN)
+
+
+def get_plan_limits(plan, limits_version):
+    """
+    Limits of a Plan memoised in process memory per limits version
+
+    A new version (Plan.modified) in the session snapshot builds them again.
+    """
+    key = (frappe.local.site, plan, limits_version)
+    limits = _plan_limits.get(key)
+    if limits is None:
+        if len(_plan_limits) >= MAX_PLAN_LIMITS:
+            _plan_limits.clear()
+        limits = _plan_limits[key] = build_plan_limits(plan)
+    return limits
+
+
+def build_plan_limits(plan):
+    values = frappe.db.get_value("Plan", plan, LIMIT_FIELDS, as_dict=True) or {}
+
+    limits = {"plan": plan}
+    for field in LIMIT_FIELDS:
+        limits[field] = values.get(field) or 0
+
+    limits["document_limits"] = {
+        row.document_type: row.max_documents
+        for row in frappe.get_all(
+            "Plan Document Limit",
+            filters={"parent": plan, "parenttype": "Plan"},
+            fields=["document_type", "max_documents"])
+        if not is_unlimited(row.max_documents)
+    }
+    return limits
+
+
+def check_insert_limits(doc, tenant_id):
+    """
+    Throw TenantLimitExceededError if inserting `doc` would take the tenant
+    over its plan
+
+    Only DocTypes with a limit (User, File, Plan Document Limit rows) read
+    the tenant's usage counters; everything else costs one cached lookup.
+    """
+    limits = get_tenant_limits(tenant_id)
+    if not limits:
+        return
+
+    if doc.doctype == "User":
+        limit = limits.get("max_users")
+        label = "users"
+    elif doc.doctype == "File":
+        max_storage_gb = limits.get("max_storage_gb")
+        if is_unlimited(max_storage_gb):
+            return
+        used = get_document_usage(tenant_id, "File")["file_size"]
+        if used + (doc.get("file_size") or 0) > max_storage_gb * 1024 ** 3:
+            raise_limit_exceeded(limits, f"{max_storage_gb} GB of file storage")
+        return
+    else:
+        limit = limits["document_limits"].get(doc.doctype)
+        label = f"{doc.doctype} documents"
+
+    if is_unlimited(limit):
+        return
+    if get_document_usage(tenant_id, doc.doctype)["document_count"] >= limit:
+        raise_limit_exceeded(limits, f"{limit} {label}")
+
+
+def raise_limit_exceeded(limits, allowance):
+    frappe.throw(
+        f"Your plan ({limits['plan']}) allows {allowance}. "
+        "Upgrade your plan or remove unused records to add more.",
+        TenantLimitExceededError, title="Plan Limit Reached")
+
+
+def is_unlimited(value):
+    return not value or value < 0
+
+
+def clear_tenant_limits(tenant_id=None):
+    """Drop cached limits for one tenant, or all of them"""
+    if tenant_id:
+        frappe.cache().hdel(LIMITS_CACHE_KEY, tenant_id)
+    else:
+        frappe.cache().delete_key(LIMITS_CACHE_KEY)
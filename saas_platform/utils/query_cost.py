@@ -0,0 +1,147 @@
+"""
+Per-tenant query cost instrumentation
+
+When `saas_query_cost_enabled` is set, every `frappe.db.sql` call made
+during a request or background job is timed and tagged with the DocType
+it touches. Totals are kept in memory for the request and flushed once,
+at the end, into per-minute Redis buckets keyed by the resolved tenant_id.
+Buckets expire after `saas_query_cost_window` minutes (default 60).
+
+Rows are the cursor's row count (rows returned by a SELECT, affected by
+a write), not rows examined: those would need a SHOW SESSION STATUS
+round trip per statement.
+"""
+import re
+import time
+from collections import defaultdict
+
+import frappe
+
+from saas_platform.utils.tenant import get_tenant_id
+
+BUCKET_PREFIX = "saas_platform:query_cost"
+DEFAULT_WINDOW = 60  # minutes
+METRICS = ("queries", "db_time", "rows_returned")
+
+TABLE_PATTERN = re.compile(r"`tab([^`]+)`")
+
+
+def is_enabled():
+    return bool(frappe.conf.get("saas_query_cost_enabled"))
+
+
+def get_window():
+    return int(frappe.conf.get("saas_query_cost_window") or DEFAULT_WINDOW)
+
+
+def start_recording(*args, **kwargs):
+    """before_request / before_job hook: wrap frappe.db.sql for this request"""
+    if not is_enabled() or not getattr(frappe.local, "db", None):
+        return
+
+    db = frappe.local.db
+    if "sql" in db.__dict__:
+        return
+
+    stats = defaultdict(lambda: [0, 0.0, 0])
+    frappe.local.saas_query_stats = stats
+    sql = db.sql
+
+    def timed_sql(query, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return sql(query, *args, **kwargs)
+        finally:
+            match = TABLE_PATTERN.search(query) if isinstance(query, str) else None
+            entry = stats[match.group(1) if match else ""]
+            entry[0] += 1
+            entry[1] += time.monotonic() - start
+            entry[2] += max(getattr(db._cursor, "rowcount", 0) or 0, 0)
+
+    db.sql = timed_sql
+
+
+def stop_recording(*args, **kwargs):
+    """after_request / after_job hook: unwrap frappe.db.sql and flush totals"""
+    stats = getattr(frappe.local, "saas_query_stats", None)
+    if stats is None:
+        return
+
+    frappe.local.saas_query_stats = None
+    db = getattr(frappe.local, "db", None)
+    if db is not None:
+        db.__dict__.pop("sql", None)
+
+    if not stats:
+        return
+
+    try:
+        flush(get_tenant_id() or "SYSTEM", stats)
+    except Exception:
+        # Instrumentation must never fail the request
+        frappe.log_error("Failed to flush tenant query cost")
+
+
+def flush(tenant_id, stats):
+    """
+    Add one request's totals to the current minute bucket
+
+    Args:
+            tenant_id: Tenant the request ran for
+            stats: doctype -> [queries, db_time, rows_returned]
+    """
+    cache = frappe.cache()
+    key = cache.make_key(f"{BUCKET_PREFIX}:{int(time.time() // 60)}")
+
+    pipe = cache.pipeline(transaction=False)
+    for doctype, values in stats.items():
+        for metric, value in zip(METRICS, values):
+            pipe.hincrbyfloat(key, f"{tenant_id}|{doctype}|{metric}", value)
+    pipe.expire(key, (get_window() + 1) * 60)
+    pipe.execute()
+
+
+def get_usage(minutes=None, by_doctype=False):
+    """
+    Aggregate query cost over the last `minutes`
+
+    Args:
+            minutes: Window to aggregate, capped at `saas_query_cost_window`
+            by_doctype: Break totals down per DocType
+
+    Returns:
+            list: dicts with tenant_id, (doctype), queries, db_time, rows_returned and
+                  share (% of all DB time), sorted by db_time descending
+    """
+    window = get_window()
+    minutes = min(int(minutes or window), window)
+    current = int(time.time() // 60)
+
+    cache = frappe.cache()
+    pipe = cache.pipeline(transaction=False)
+    for minute in range(current - minutes + 1, current + 1):
+        pipe.hgetall(cache.make_key(f"{BUCKET_PREFIX}:{minute}"))
+
+    totals = defaultdict(lambda: dict.fromkeys(METRICS, 0.0))
+    for bucket in pipe.execute():
+        for field, value in bucket.items():
+            tenant_id, doctype, metric = field.decode().rsplit("|", 2)
+            if metric not in METRICS:
+                continue
+            group = (tenant_id, doctype) if by_doctype else (tenant_id,)
+            totals[group][metric] += float(value)
+
+    grand_total = sum(t["db_time"] for t in totals.values()) or 1
+    usage = []
+    for group, values in totals.items():
+        row = frappe._dict(tenant_id=group[0])
+        if by_doctype:
+            row.doctype = group[1] or None
+        row.queries = int(values["queries"])
+        row.db_time = round(values["db_time"], 3)
+        row.rows_returned = int(values["rows_returned"])
+        row.share = round(100 * values["db_time"] / grand_total, 2)
+        usage.append(row)
+
+    usage.sort(key=lambda row: row.db_time, reverse=True)
+    return usage
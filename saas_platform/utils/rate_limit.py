@@ -0,0 +1,178 @@
+"""
+Per-tenant API rate limiting and concurrency quotas
+
+Every /api/ request of a tenant user counts against the Plan's
+max_api_calls_per_day, takes a token from the tenant's bucket (refilled
+at api_requests_per_minute) and a slot of max_concurrent_requests. Over
+a limit the request gets HTTP 429 with a Retry-After header.
+
+Counters live in Redis. Only plain commands (WATCH/MULTI, INCR, EXPIRE)
+are used, so any Redis-compatible server works; point
+`saas_rate_limit_redis_url` at a local stand-in to keep the counters off
+the cache Redis.
+"""
+import math
+import time
+from datetime import datetime, timezone
+
+import frappe
+import redis
+
+from saas_platform.utils.plan_limits import get_tenant_limits, is_unlimited
+from saas_platform.utils.tenant import get_tenant_id
+
+KEY_PREFIX = "saas_platform:rate_limit"
+# Concurrency counters self-heal after this long if a decrement is lost
+CONCURRENCY_KEY_TTL = 300
+DAILY_KEY_TTL = 2 * 86400
+
+
+class CounterStore:
+    """Token bucket and concurrency counters on a Redis-compatible client"""
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def take_token(self, bucket, rate, capacity, now=None):
+        """
+        Take one token from a bucket refilled at `rate` tokens/second
+
+        Returns:
+                float: 0 if a token was taken, else seconds until one is available
+        """
+        key = f"{self.prefix}:bucket:{bucket}"
+        now = time.time() if now is None else now
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    tokens, updated = pipe.hmget(key, "tokens", "ts")
+                    tokens = float(tokens) if tokens is not None else capacity
+                    updated = float(updated) if updated is not None else now
+                    tokens = min(capacity, tokens + max(0, now - updated) * rate)
+
+                    wait = 0.0
+                    if tokens >= 1:
+                        tokens -= 1
+                    else:
+                        wait = (1 - tokens) / rate
+
+                    pipe.multi()
+                    pipe.hset(key, mapping={"tokens": tokens, "ts": now})
+                    pipe.expire(key, math.ceil(capacity / rate) + 1)
+                    pipe.execute()
+                    return wait
+                except redis.WatchError:
+                    continue
+
+    def acquire(self, name, limit):
+        """Take a concurrency slot; False if `limit` slots are in use"""
+        key = f"{self.prefix}:concurrent:{name}"
+        with self.client.pipeline(transaction=True) as pipe:
+            count, _ = pipe.incr(key).expire(key, CONCURRENCY_KEY_TTL).execute()
+        if count > limit:
+            self.release(name)
+            return False
+        return True
+
+    def release(self, name):
+        self.client.decr(f"{self.prefix}:concurrent:{name}")
+
+    def count_daily(self, name):
+        """Count one call for today (UTC) and return today's total"""
+        key = f"{self.prefix}:daily:{name}:{get_day()}"
+        with self.client.pipeline(transaction=True) as pipe:
+            count, _ = pipe.incr(key).expire(key, DAILY_KEY_TTL).execute()
+        return count
+
+    def get_daily_counts(self, names):
+        """Today's call counts for many names in one round trip"""
+        day = get_day()
+        keys = [f"{self.prefix}:daily:{name}:{day}" for name in names]
+        return {name: int(count or 0)
+                for name, count in zip(names, self.client.mget(keys) if keys else [])}
+
+
+def get_store():
+    if not hasattr(frappe.local, "saas_rate_limit_store"):
+        url = frappe.conf.get("saas_rate_limit_redis_url")
+        if url:
+            client = redis.Redis.from_url(url)
+            prefix = f"{frappe.local.site}:{KEY_PREFIX}"
+        else:
+            client = frappe.cache()
+            prefix = client.make_key(KEY_PREFIX).decode()
+        frappe.local.saas_rate_limit_store = CounterStore(client, prefix)
+    return frappe.local.saas_rate_limit_store
+
+
+def enforce_tenant_rate_limit():
+    """
+    before_request / auth hook: apply the tenant's API limits
+
+    Registered for both so token / API key requests (authenticated after
+    before_request) are covered too; runs at most once per request.
+    """
+    if getattr(frappe.local, "saas_rate_limit_checked", False):
+        return
+
+    user = frappe.session.user
+    if user in ("Guest", "Administrator"):
+        return
+
+    request = getattr(frappe.local, "request", None)
+    if not request or not request.path.startswith("/api/"):
+        return
+
+    frappe.local.saas_rate_limit_checked = True
+
+    tenant_id = get_tenant_id()
+    limits = get_tenant_limits(tenant_id)
+    if not limits:
+        return
+
+    store = get_store()
+
+    daily = limits.get("max_api_calls_per_day")
+    if not is_unlimited(daily) and store.count_daily(tenant_id) > daily:
+        reject(seconds_until_tomorrow(), "Daily API call limit of your plan reached")
+
+    rpm = limits.get("api_requests_per_minute")
+    if not is_unlimited(rpm):
+        wait = store.take_token(tenant_id, rate=rpm / 60.0, capacity=rpm)
+        if wait:
+            reject(wait, "API rate limit exceeded for your plan")
+
+    concurrent = limits.get("max_concurrent_requests")
+    if not is_unlimited(concurrent):
+        if not store.acquire(tenant_id, concurrent):
+            reject(1, "Too many concurrent requests for your plan")
+        frappe.local.saas_rate_limit_slot = tenant_id
+
+
+def get_day():
+    return datetime.now(timezone.utc).strftime("%Y%m%d")
+
+
+def seconds_until_tomorrow():
+    now = datetime.now(timezone.utc)
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+def reject(retry_after, message):
+    frappe.local.saas_retry_after = max(1, math.ceil(retry_after))
+    frappe.throw(message, frappe.TooManyRequestsError)
+
+
+def after_request(response=None, request=None):
+    """after_request hook: free the concurrency slot, add Retry-After on 429"""
+    tenant_id = getattr(frappe.local, "saas_rate_limit_slot", None)
+    if tenant_id:
+        get_store().release(tenant_id)
+        frappe.local.saas_rate_limit_slot = None
+
+    retry_after = getattr(frappe.local, "saas_retry_after", None)
+    if retry_after and response is not None:
+        response.headers["Retry-After"] = str(retry_after)
@@ -0,0 +1,94 @@
+"""Cached per-DocType tenant stamping plans for the before_insert hook"""
+import frappe
+
+PLAN_CACHE_KEY = "saas_platform:stamping_plan"
+
+# DocTypes that never get a tenant_id stamped on insert
+UNSTAMPED_DOCTYPES = frozenset([
+    'Role', 'DocType', 'DocField', 'DocPerm', 'Module Def',
+    'Domain', 'Domain Settings', 'Tenant', 'Plan',
+    'Subscription', 'Subscription Plan Detail',
+    'Workspace', 'Workflow', 'Print Format', 'Email Template',
+    'System Settings', 'Website Settings', 'Portal Settings',
+    'Error Log', 'Activity Log', 'Version', 'Communication',
+    'Comment', 'File', 'Session'
+])
+
+
+def get_stamping_plan(doctype):
+    """
+    Get the stamping plan for a DocType
+
+    The plan is built once from meta and cached in Redis (Frappe also
+    memoises hget per request), so bulk inserts pay a dict lookup.
+
+    Args:
+            doctype: DocType name
+
+    Returns:
+            dict: {"scoped": bool, "child_fields": [table fieldnames to stamp]}
+    """
+    plan = frappe.cache().hget(PLAN_CACHE_KEY, doctype)
+    if plan is None:
+        plan = build_stamping_plan(doctype)
+        frappe.cache().hset(PLAN_CACHE_KEY, doctype, plan)
+    return plan
+
+
+def build_stamping_plan(doctype):
+    """Work out whether a DocType is tenant-scoped and which child tables to stamp"""
+    if doctype in UNSTAMPED_DOCTYPES or not has_tenant_column(doctype):
+        return {"scoped": False, "child_fields": []}
+
+    meta = frappe.get_meta(doctype)
+    child_fields = [
+        df.fieldname for df in meta.get_table_fields()
+        if has_tenant_column(df.options)
+    ]
+    return {"scoped": True, "child_fields": child_fields}
+
+
+def has_tenant_column(doctype):
+    try:
+        if frappe.get_meta(doctype).is_virtual:
+            return False
+        return "tenant_id" in frappe.db.get_table_columns(doctype)
+    except Exception:
+        # Table not created yet (e.g. during install)
+        return False
+
+
+def stamp_tenant_id(doc, tenant_id, plan=None):
+    """
+    Set tenant_id on a document and its child rows according to its plan
+
+    Args:
+            doc: Document being inserted
+            tenant_id: Tenant ID to stamp
+            plan: Stamping plan, looked up if not passed
+    """
+    plan = plan or get_stamping_plan(doc.doctype)
+    doc.tenant_id = tenant_id
+    for fieldname in plan["child_fields"]:
+        for row in doc.get(fieldname) or []:
+            row.tenant_id = tenant_id
+
+
+def clear_stamping_plan(doctype=None):
+    """Drop cached plans for one DocType, or all of them"""
+    if doctype:
+        frappe.cache().hdel(PLAN_CACHE_KEY, doctype)
+    else:
+        frappe.cache().delete_key(PLAN_CACHE_KEY)
+
+
+def on_doctype_update(doc, method=None):
+    """doc_events hook: rebuild plans when DocType meta changes"""
+    # Parents embedding this DocType as a child table are affected too
+    clear_stamping_plan(doc.name if not doc.istable else None)
+
+
+def on_custom_field_change(doc, method=None):
+    """doc_events hook: rebuild plans when a Custom Field is added/removed"""
+    # A tenant_id field on a child DocType affects every parent embedding it
+    clear_stamping_plan(doc.dt if doc.fieldname != "tenant_id" else None)
@@ -1,27 +1,45 @@
 """Tenant management utilities"""
 import frappe
 from frappe import _
-import random
-import string
+
+from saas_platform.utils.naming import allocate_random_id
+from saas_platform.utils.plan_limits import check_insert_limits
+from saas_platform.utils.tenant_resolver import resolve_tenant_id, clear_user_tenant_cache
+from saas_platform.utils.tenant_predicate import get_tenant_condition
+from saas_platform.utils.tenant_routing import get_request_tenant_id
+from saas_platform.utils.stamping import get_stamping_plan, stamp_tenant_id
+from saas_platform.utils.tenant_session import get_session_snapshot, set_session_snapshot
+from saas_platform.utils.tenant_token import set_token_cookie
+
+# DocTypes that are never filtered by tenant_id
+UNFILTERED_DOCTYPES = frozenset([
+    'User', 'Role', 'DocType', 'DocField', 'DocPerm', 'Module Def',
+    'Domain', 'Domain Settings', 'Tenant', 'Plan', 'Subscription Plan',
+    'Subscription', 'Subscription Plan Detail', 'Customer',
+    'Workspace', 'Workflow', 'Print Format', 'Email Template',
+    'System Settings', 'Website Settings', 'Portal Settings',
+    'Error Log', 'Activity Log', 'Version', 'Communication',
+    'Comment', 'File', 'Custom Field'
+])
 
 
 def on_session_creation(login_manager):
     """
     Post-login hook to set tenant_id in session.
     Called after user successfully logs in.
+
+    Stores a compact tenant snapshot (tenant_id, status, plan, limits
+    version) in the session data, read from User.tenant_id through the
+    resolver cache instead of loading the full User document.
     """
     user = login_manager.user
 
     # Administrator always gets SYSTEM tenant_id
-    if user == "Administrator":
-        frappe.session['tenant_id'] = "SYSTEM"
-        frappe.log(f"Session created for Administrator with tenant_id=SYSTEM")
-        return
+    tenant_id = "SYSTEM" if user == "Administrator" else None
 
-    # Get tenant_id from User document
     try:
-        user_doc = frappe.get_doc("User", user)
-        tenant_id = getattr(user_doc, 'tenant_id', None)
+        snapshot = set_session_snapshot(user, tenant_id)
+        tenant_id = snapshot.tenant_id if snapshot else resolve_tenant_id(user)
 
         if tenant_id:
             frappe.session['tenant_id'] = tenant_id
@@ -29,6 +47,9 @@ def on_session_creation(login_manager):
                 f"Session created for {user} with tenant_id={tenant_id}")
         else:
             frappe.log(f"Warning: User {user} has no tenant_id assigned")
+
+        # Signed tenant context for microservices (verified locally)
+        set_token_cookie(user, tenant_id)
     except Exception as e:
         frappe.log_error(f"Failed to get tenant_id for user {user}: {str(e)}")
 
@@ -39,61 +60,38 @@ def set_tenant_id(doc, method=None):
     if frappe.session.user == "Administrator":
         return
 
-    # Skip system doctypes that shouldn't have tenant isolation
-    system_doctypes = [
-        'Usera', 'Role', 'DocType', 'DocField', 'DocPerm', 'Module Def',
-        'Domain', 'Domain Settings', 'Tenant', 'Plan', 'aSubscription Plan',
-        'Subscription', 'Subscription Plan Detail', 'aCustomer',
-        'Workspace', 'Workflow', 'Print Format', 'Email Template',
-        'System Settings', 'Website Settings', 'Portal Settings',
-        'Error Log', 'Activity Log', 'Version', 'Communication',
-        'Comment', 'File', 'Session', 'aToken Cache'
-    ]
-
-    if doc.doctype in system_doctypes:
+    # Skip DocTypes that aren't tenant-scoped (cached per DocType)
+    plan = get_stamping_plan(doc.doctype)
+    if not plan["scoped"]:
+        # Files aren't stamped but count against the uploader's storage
+        if doc.doctype == "File" and get_tenant_id():
+            check_insert_limits(doc, get_tenant_id())
         return
 
-    # Skip if tenant_id is already set
-    if getattr(doc, 'tenant_id', None):
-        return
+    # Keep an explicitly set tenant_id, otherwise use the current user's
+    tenant_id = doc.get('tenant_id') or get_tenant_id()
 
-    # Get current user's tenant_id from context or user
-    tenant_id = frappe.session.get('tenant_id')
-    print("Tenant ID in session:", tenant_id)
-    if not tenant_id:
-        # Try to get tenant_id from the User's default tenant
-        try:
-            user = frappe.get_doc("User", frappe.session.user)
-            if hasattr(user, 'tenant_id') and user.tenant_id:
-                tenant_id = user.tenant_id
-        except:
-            pass
-
-    # Set tenant_id if found
     if tenant_id:
-        doc.tenant_id = tenant_id
+        stamp_tenant_id(doc, tenant_id, plan)
+        check_insert_limits(doc, tenant_id)
 
 
 def generate_tenant_id():
-    """Generate a unique tenant ID"""
-    while True:
-        # Generate a random 8-character alphanumeric ID
-        tenant_id = ''.join(random.choices(
-            string.ascii_uppercase + string.digits, k=8))
-
-        # Check if it already exists
-        if not frappe.db.exists("Tenant", {"tenant_id": tenant_id}):
-            return tenant_id
+    """Generate a unique tenant ID (random 8-character alphanumeric)"""
+    return allocate_random_id("Tenant", "tenant_id", length=8)
 
 
 def get_tenant_id():
-    """Get the current user's tenant_id"""
-    tenant_id = frappe.session.get('tenant_id')
+    """Get the current user's tenant_id, for Guests the tenant of the request's host"""
+    snapshot = get_session_snapshot()
+    tenant_id = snapshot.get('tenant_id') if snapshot else frappe.session.get('tenant_id')
+
+    if not tenant_id and frappe.session.user == "Guest":
+        return get_request_tenant_id()
 
     if not tenant_id:
-        user = frappe.get_doc("User", frappe.session.user)
-        if hasattr(user, 'tenant_id') and user.tenant_id:
-            tenant_id = user.tenant_id
+        tenant_id = resolve_tenant_id(frappe.session.user)
+        if tenant_id:
             frappe.session['tenant_id'] = tenant_id
 
     return tenant_id
@@ -105,7 +103,7 @@ def apply_tenant_filter(doc, method=None):
 
     if tenant_id:
         # Allow access to SYSTEM tenant data and own tenant data
-        return f"(`tabtenantid` = '{tenant_id}' OR `tab{doc.doctype}`.`tenant_id` = 'SYSTEM' OR `tab{doc.doctype}`.`tenant_id` IS NULL)"
+        return get_tenant_condition(doc.doctype, tenant_id)
 
     return None
 
@@ -121,28 +119,11 @@ def get_permission_query_conditions(user, doctype):
         return None
 
     # System doctypes don't get filtered
-    system_doctypes = [
-        'User', 'Role', 'DocType', 'DocField', 'DocPerm', 'Module Def',
-        'Domain', 'Domain Settings', 'Tenant', 'Plan', 'Subscription Plan',
-        'Subscription', 'Subscription Plan Detail', 'Customer',
-        'Workspace', 'Workflow', 'Print Format', 'Email Template',
-        'System Settings', 'Website Settings', 'Portal Settings',
-        'Error Log', 'Activity Log', 'Version', 'Communication',
-        'Comment', 'File', 'Custom Field'
-    ]
-
-    if doctype in system_doctypes:
+    if doctype in UNFILTERED_DOCTYPES:
         return None
 
-    # Get user's tenant_id
-    tenant_id = get_tenant_id()
-
-    if not tenant_id:
-        # User has no tenant - they can only see SYSTEM data
-        return f"(`tab{doctype}`.`tenant_id` = 'SYSTEM' OR `tab{doctype}`.`tenant_id` IS NULL)"
-
-    # User can see their own tenant's data + SYSTEM data
-    return f"(`tab{doctype}`.`tenant_id` = '{tenant_id}' OR `tab{doctype}`.`tenant_id` = 'SYSTEM' OR `tab{doctype}`.`tenant_id` IS NULL)"
+    # Own tenant's data + SYSTEM data, or only SYSTEM data without a tenant
+    return get_tenant_condition(doctype, get_tenant_id())
 
 
 def setup_user_tenant():
@@ -170,5 +151,6 @@ def setup_user_tenant():
     # 2. Set Administrator tenant_id
     frappe.db.set_value("User", "Administrator", "tenant_id",
                         "SYSTEM", update_modified=False)
+    clear_user_tenant_cache("Administrator")
     frappe.db.commit()
     frappe.log("Set Administrator tenant_id = SYSTEM")
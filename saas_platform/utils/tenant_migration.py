@@ -0,0 +1,177 @@
+"""
+Parallel, resumable tenant_id schema migration
+
+Adds the tenant_id column and its index to every non-single DocType
+table with a single online ALTER per table, on a bounded worker pool,
+largest tables first. Progress is checkpointed to the site's private
+folder so an interrupted run picks up where it stopped.
+"""
+
+import json
+import os
+import time
+
+import frappe
+
+from saas_platform.utils.stamping import clear_stamping_plan
+from saas_platform.utils.workers import map_in_site_threads
+
+DEFAULT_WORKERS = 4
+CHECKPOINT_FILE = "tenant_id_migration.json"
+
+COLUMN_DEFINITION = "tenant_id VARCHAR(140) NOT NULL DEFAULT 'SYSTEM'"
+
+# MariaDB/MySQL errors raised when the requested ALGORITHM/LOCK is unsupported
+UNSUPPORTED_ALGORITHM_ERRORS = (1845, 1846)
+
+
+def migrate_tenant_columns(max_workers=None):
+    """
+    Add tenant_id (column + index) to all tables that still need it
+
+    Args:
+            max_workers: Pool size (site_config `saas_migration_workers`)
+
+    Returns:
+            dict: {"added": [...], "skipped": [...], "errors": {table: error}}
+    """
+    max_workers = max_workers or frappe.conf.get(
+        "saas_migration_workers") or DEFAULT_WORKERS
+
+    checkpoint = load_checkpoint()
+    done = set(checkpoint["done"])
+
+    plan = [t for t in get_table_plan() if t.table_name not in done]
+    pending = [t for t in plan if not (t.has_column and t.has_index)]
+
+    result = {
+        "added": [],
+        "skipped": [t.table_name for t in plan if t.has_column and t.has_index],
+        "errors": {},
+    }
+    checkpoint["done"].extend(result["skipped"])
+    save_checkpoint(checkpoint)
+
+    print(f"\n📋 {len(pending)} tables to migrate "
+          f"({len(done) + len(result['skipped'])} already done), "
+          f"{max_workers} workers")
+
+    # Release metadata locks held by this connection before workers ALTER
+    frappe.db.commit()
+
+    for table, elapsed, error in map_in_site_threads(
+            migrate_table, pending, max_workers):
+        if error:
+            print(f"   ❌ {table.table_name}: {error}")
+            result["errors"][table.table_name] = str(error)
+            checkpoint["failed"][table.table_name] = str(error)
+        else:
+            print(f"   ➕ {table.table_name} ({elapsed:.1f}s)")
+            result["added"].append(table.table_name)
+            checkpoint["done"].append(table.table_name)
+            checkpoint["failed"].pop(table.table_name, None)
+        save_checkpoint(checkpoint)
+
+    if not result["errors"]:
+        clear_checkpoint()
+
+    # Child tables may have gained a tenant_id column
+    clear_stamping_plan()
+
+    return result
+
+
+def get_table_plan():
+    """
+    Tables of all non-single DocTypes with their current tenant_id state,
+    read from information_schema in one query, largest first.
+    """
+    doctypes = frappe.get_all(
+        "DocType", filters={"issingle": 0, "is_virtual": 0}, pluck="name")
+    if not doctypes:
+        return []
+
+    return frappe.db.sql("""
+        SELECT t.TABLE_NAME AS table_name,
+            COALESCE(t.DATA_LENGTH, 0) + COALESCE(t.INDEX_LENGTH, 0) AS size,
+            EXISTS(
+                SELECT 1 FROM information_schema.COLUMNS c
+                WHERE c.TABLE_SCHEMA = t.TABLE_SCHEMA
+                    AND c.TABLE_NAME = t.TABLE_NAME
+                    AND c.COLUMN_NAME = 'tenant_id'
+            ) AS has_column,
+            EXISTS(
+                SELECT 1 FROM information_schema.STATISTICS s
+                WHERE s.TABLE_SCHEMA = t.TABLE_SCHEMA
+                    AND s.TABLE_NAME = t.TABLE_NAME
+                    AND s.COLUMN_NAME = 'tenant_id'
+                    AND s.SEQ_IN_INDEX = 1
+            ) AS has_index
+        FROM information_schema.TABLES t
+        WHERE t.TABLE_SCHEMA = DATABASE()
+            AND t.TABLE_NAME IN %s
+        ORDER BY size DESC
+    """, (tuple(f"tab{d}" for d in doctypes),), as_dict=True)
+
+
+def migrate_table(table):
+    """
+    Add the missing tenant_id column and/or index with one ALTER
+
+    Args:
+            table: Row from get_table_plan()
+
+    Returns:
+            float: Seconds spent
+    """
+    start = time.monotonic()
+    clauses = []
+    if not table.has_column:
+        clauses.append(f"ADD COLUMN {COLUMN_DEFINITION}")
+    if not table.has_index:
+        clauses.append(f"ADD INDEX `{table.table_name}_tenant_id_index` (tenant_id)")
+
+    if clauses:
+        alter_table_online(table.table_name, clauses)
+
+    return time.monotonic() - start
+
+
+def alter_table_online(table_name, clauses):
+    """
+    Run one ALTER TABLE, online (INPLACE, no lock) where the server allows
+    it and with the server's default algorithm otherwise.
+    """
+    statement = f"ALTER TABLE `{table_name}` {', '.join(clauses)}"
+    try:
+        frappe.db.sql_ddl(f"{statement}, ALGORITHM=INPLACE, LOCK=NONE")
+    except Exception as e:
+        if getattr(e, "args", (None,))[0] not in UNSUPPORTED_ALGORITHM_ERRORS:
+            raise
+        frappe.db.sql_ddl(statement)
+
+
+def get_checkpoint_path():
+    return frappe.get_site_path("private", CHECKPOINT_FILE)
+
+
+def load_checkpoint():
+    path = get_checkpoint_path()
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"done": [], "failed": {}}
+
+
+def save_checkpoint(checkpoint):
+    path = get_checkpoint_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint():
+    path = get_checkpoint_path()
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,34 @@
+"""Sargable tenant_id predicates for permission query conditions"""
+from functools import lru_cache
+
+import frappe
+
+SHARED_TENANT_ID = "SYSTEM"
+
+
+def get_tenant_condition(doctype, tenant_id=None):
+    """
+    Build the tenant isolation condition for a DocType.
+
+    Emits a single `tenant_id IN (...)` predicate so MariaDB can use the
+    tenant_id index. NULL tenant_ids are backfilled to SYSTEM by the
+    backfill_null_tenant_id patch, so no `IS NULL` branch is needed.
+
+    Args:
+            doctype: DocType name
+            tenant_id: Tenant ID of the current user, None for SYSTEM only
+
+    Returns:
+            str: SQL WHERE condition
+    """
+    return _build_condition(doctype, tenant_id or SHARED_TENANT_ID)
+
+
+@lru_cache(maxsize=4096)
+def _build_condition(doctype, tenant_id):
+    tenant_ids = [SHARED_TENANT_ID]
+    if tenant_id != SHARED_TENANT_ID:
+        tenant_ids.insert(0, tenant_id)
+
+    values = ", ".join(frappe.db.escape(t) for t in tenant_ids)
+    return f"`tab{doctype}`.`tenant_id` IN ({values})"
@@ -0,0 +1,426 @@
+"""
+Throttled tenant offboarding / purge
+
+Removes a churned tenant's rows from every tenant-scoped table in
+primary-key-ordered chunks (one short transaction per chunk), then
+tears down the Tenant with its Customer and Subscription.
+
+Records that are never stamped with a tenant_id go first, while the
+tenant's users and documents still exist to find them: Files uploaded
+by the tenant's users (deleted through File, so the files on disk go
+too), and Communications, Comments, Versions and Activity Logs
+referencing the tenant's documents.
+
+Between chunks the purge sleeps and backs off while the replica
+(`replica_host`) lags or the primary is busy, so deletes never pile up
+replication lag or long lock waits. Progress and the resume checkpoint
+are stored on the Tenant (`purge_status`, `purge_progress`,
+`purge_log`); an interrupted purge continues where it stopped.
+
+Config (site_config.json):
+    saas_purge_chunk_size             rows per DELETE (default 1000)
+    saas_purge_chunk_sleep            seconds between chunks (default 0.1)
+    saas_purge_max_replication_lag    seconds (default 5)
+    saas_purge_max_threads_running    primary Threads_running (default 30)
+    saas_purge_max_backoff            seconds to wait for the replica / primary
+                                      before failing the purge (default 3600)
+
+Replication lag is read with `SHOW SLAVE STATUS` on `replica_host`, which
+needs the REPLICATION CLIENT privilege (MariaDB 10.5+: SLAVE MONITOR /
+REPLICA MONITOR) for the replica DB user:
+
+    GRANT REPLICATION CLIENT ON *.* TO '<db user>'@'%';
+
+If it cannot be read the purge fails (and can be resumed once granted)
+rather than deleting without lag throttling. A stopped replica counts as
+lagging.
+
+Usage:
+    Tenant form > Purge Data, or
+    bench --site dev.localhost execute saas_platform.utils.tenant_purge.queue_purge --kwargs "{'tenant': 'TEN-0001'}"
+"""
+import json
+import time
+
+import frappe
+from frappe.database import get_db
+
+from saas_platform.utils.plan_limits import clear_tenant_limits
+from saas_platform.utils.tenant_migration import get_table_plan
+from saas_platform.utils.tenant_resolver import clear_user_tenant_cache
+from saas_platform.utils.tenant_session import delete_user_sessions
+
+# Kept: the Tenant is deleted last through its controller, and the
+# outbox must keep the tenant's events for downstream consumers
+KEPT_TABLES = frozenset(["tabTenant", "tabTenant Change Event"])
+
+# Unstamped (always SYSTEM) tables: (table, reference doctype column, reference name column)
+REFERENCE_TABLES = (
+    ("tabCommunication", "reference_doctype", "reference_name"),
+    ("tabComment", "reference_doctype", "reference_name"),
+    ("tabVersion", "ref_doctype", "docname"),
+    ("tabActivity Log", "reference_doctype", "reference_name"),
+)
+FILES_KEY = "File|owner"
+PURGEABLE_STATUSES = ("Suspended", "Deleted")
+PURGE_JOB_TIMEOUT = 4 * 3600  # seconds, longer purges resume hourly
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_SLEEP = 0.1
+DEFAULT_MAX_REPLICATION_LAG = 5
+DEFAULT_MAX_THREADS_RUNNING = 30
+DEFAULT_MAX_BACKOFF = 3600
+BACKOFF_SLEEP = 5
+
+
+class ReplicationLagUnavailable(frappe.ValidationError):
+    pass
+
+
+def queue_purge(tenant):
+    """
+    Queue the purge of a suspended or deleted tenant
+
+    Args:
+            tenant: Tenant name
+    """
+    status = frappe.db.get_value("Tenant", tenant, "status")
+    if status not in PURGEABLE_STATUSES:
+        frappe.throw(
+            f"Tenant {tenant} must be {' or '.join(PURGEABLE_STATUSES)} before its data is purged")
+
+    frappe.db.set_value("Tenant", tenant, "purge_status", "Queued", update_modified=False)
+    enqueue_purge(tenant)
+
+
+def enqueue_purge(tenant):
+    frappe.enqueue(
+        "saas_platform.utils.tenant_purge.purge_tenant",
+        queue="long",
+        timeout=PURGE_JOB_TIMEOUT,
+        job_id=f"saas_purge_{tenant}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        tenant=tenant,
+    )
+
+
+def resume_purges():
+    """Scheduler job: restart purges whose job timed out or died"""
+    for tenant in frappe.get_all(
+            "Tenant", filters={"purge_status": ["in", ["Queued", "Running"]]}, pluck="name"):
+        enqueue_purge(tenant)
+
+
+def purge_tenant(tenant):
+    """
+    Background job: delete all of a tenant's rows, then the Tenant itself
+
+    Args:
+            tenant: Tenant name
+    """
+    if not frappe.db.exists("Tenant", tenant):
+        return
+
+    tenant_id, log = frappe.db.get_value("Tenant", tenant, ["tenant_id", "purge_log"])
+    log = json.loads(log or "{}")
+    log.setdefault("done", {})
+    log.setdefault("deleted", 0)
+
+    tables = [
+        t.table_name for t in get_table_plan()
+        if t.has_column and t.table_name not in KEPT_TABLES
+    ]
+    if "total" not in log:
+        log["total"] = (
+            sum(count_rows(table_name, tenant_id) for table_name in tables)
+            + count_files(tenant_id)
+            + sum(count_references(ref, table_name, tenant_id)
+                  for ref in REFERENCE_TABLES for table_name in tables)
+        )
+
+    throttle = Throttle()
+    try:
+        set_purge_progress(tenant, "Running", log)
+
+        # Before the users and documents they are found through are gone
+        if FILES_KEY not in log["done"]:
+            purge_matching(
+                tenant, FILES_KEY, lambda limit: get_file_chunk(tenant_id, limit),
+                log, throttle, delete=delete_files)
+        for ref in REFERENCE_TABLES:
+            for table_name in tables:
+                key = f"{ref[0]}|{table_name}"
+                if key not in log["done"]:
+                    purge_matching(
+                        tenant, key,
+                        lambda limit: get_reference_chunk(ref, table_name, tenant_id, limit),
+                        log, throttle,
+                        delete=lambda names: delete_rows(ref[0], names))
+
+        for table_name in tables:
+            if table_name not in log["done"]:
+                purge_table(tenant, tenant_id, table_name, log, throttle)
+
+        teardown_tenant(tenant, tenant_id)
+    except Exception as e:
+        frappe.db.rollback()
+        log["error"] = str(e)
+        set_purge_progress(tenant, "Failed", log)
+        frappe.log_error(f"Purge of tenant {tenant} failed: {str(e)}", "Tenant Purge")
+    finally:
+        throttle.close()
+
+
+def purge_table(tenant, tenant_id, table_name, log, throttle):
+    """Delete one table's rows of the tenant in name-ordered chunks"""
+    chunk_size = int(frappe.conf.get("saas_purge_chunk_size") or DEFAULT_CHUNK_SIZE)
+    current = log.get("current") or {}
+    after = current.get("after") if current.get("table") == table_name else None
+    deleted = current.get("deleted", 0) if current.get("table") == table_name else 0
+
+    while True:
+        names = frappe.db.sql_list(f"""
+            SELECT name FROM `{table_name}`
+            WHERE tenant_id = %(tenant_id)s {"AND name > %(after)s" if after is not None else ""}
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {"tenant_id": tenant_id, "after": after, "limit": chunk_size})
+        if not names:
+            break
+
+        if table_name == "tabUser":
+            forget_users(names)
+            delete_user_records(names)
+
+        frappe.db.sql(f"""
+            DELETE FROM `{table_name}`
+            WHERE tenant_id = %s AND name IN %s
+        """, (tenant_id, tuple(names)))
+
+        after = names[-1]
+        deleted += len(names)
+        log["deleted"] += len(names)
+        log["current"] = {"table": table_name, "after": after, "deleted": deleted}
+        set_purge_progress(tenant, "Running", log)
+
+        throttle.wait()
+
+    log["done"][table_name] = deleted
+    log.pop("current", None)
+    set_purge_progress(tenant, "Running", log)
+
+
+def purge_matching(tenant, key, get_chunk, log, throttle, delete):
+    """
+    Delete rows found by get_chunk(limit) in chunks until none are left
+
+    Deleted rows no longer match, so re-running after an interruption
+    simply continues; `key` is marked done in the log at the end.
+    """
+    chunk_size = int(frappe.conf.get("saas_purge_chunk_size") or DEFAULT_CHUNK_SIZE)
+    deleted = 0
+    while True:
+        names = get_chunk(chunk_size)
+        if not names:
+            break
+
+        delete(names)
+        deleted += len(names)
+        log["deleted"] += len(names)
+        set_purge_progress(tenant, "Running", log)
+        throttle.wait()
+
+    log["done"][key] = deleted
+    set_purge_progress(tenant, "Running", log)
+
+
+def get_file_chunk(tenant_id, limit):
+    """Files uploaded by the tenant's users (attributed like usage.reconcile_usage)"""
+    return frappe.db.sql_list("""
+        SELECT f.name FROM `tabFile` f
+        JOIN `tabUser` u ON u.name = f.owner
+        WHERE u.tenant_id = %s AND f.is_folder = 0
+        ORDER BY f.name
+        LIMIT %s
+    """, (tenant_id, limit))
+
+
+def delete_files(names):
+    # Through the controller, which removes the file from disk
+    for name in names:
+        frappe.delete_doc("File", name, force=True, ignore_permissions=True,
+                          delete_permanently=True)
+
+
+def get_reference_chunk(ref, table_name, tenant_id, limit):
+    ref_table, doctype_column, name_column = ref
+    return frappe.db.sql_list(f"""
+        SELECT r.name FROM `{ref_table}` r
+        JOIN `{table_name}` d ON d.name = r.`{name_column}`
+        WHERE r.`{doctype_column}` = %s AND d.tenant_id = %s
+        ORDER BY r.name
+        LIMIT %s
+    """, (table_name[3:], tenant_id, limit))
+
+
+def delete_rows(table_name, names):
+    if table_name == "tabCommunication":
+        frappe.db.sql("""
+            DELETE FROM `tabCommunication Link`
+            WHERE parenttype = 'Communication' AND parent IN %s
+        """, (tuple(names),))
+    frappe.db.sql(f"DELETE FROM `{table_name}` WHERE name IN %s", (tuple(names),))
+
+
+def count_files(tenant_id):
+    return frappe.db.sql("""
+        SELECT COUNT(*) FROM `tabFile` f
+        JOIN `tabUser` u ON u.name = f.owner
+        WHERE u.tenant_id = %s AND f.is_folder = 0
+    """, (tenant_id,))[0][0]
+
+
+def count_references(ref, table_name, tenant_id):
+    ref_table, doctype_column, name_column = ref
+    return frappe.db.sql(f"""
+        SELECT COUNT(*) FROM `{ref_table}` r
+        JOIN `{table_name}` d ON d.name = r.`{name_column}`
+        WHERE r.`{doctype_column}` = %s AND d.tenant_id = %s
+    """, (table_name[3:], tenant_id))[0][0]
+
+
+def forget_users(users):
+    """Drop cached tenant mappings and sessions of users about to be deleted"""
+    for user in users:
+        clear_user_tenant_cache(user)
+    delete_user_sessions(users)
+
+
+def delete_user_records(users):
+    """Rows keyed on the user that a raw DELETE from tabUser leaves behind"""
+    users = tuple(users)
+    # Has Role, User Email, ... - not reliably stamped, roles are added after insert
+    for df in frappe.get_meta("User").get_table_fields():
+        frappe.db.sql(f"""
+            DELETE FROM `tab{df.options}`
+            WHERE parenttype = 'User' AND parent IN %s
+        """, (users,))
+    frappe.db.sql("""
+        DELETE FROM `__Auth` WHERE doctype = 'User' AND name IN %s
+    """, (users,))
+    frappe.db.sql("DELETE FROM `tabDefaultValue` WHERE parent IN %s", (users,))
+
+
+def teardown_tenant(tenant, tenant_id):
+    """Delete the tenant's Subscription, Customer and finally the Tenant"""
+    doc = frappe.get_doc("Tenant", tenant)
+
+    for doctype, name in (("Subscription", doc.subscription), ("Customer", doc.customer)):
+        if name and frappe.db.exists(doctype, name):
+            delete_document(doctype, name)
+
+    frappe.db.delete("Tenant Notification Log", {"tenant": tenant})
+    delete_document("Tenant", tenant)
+    clear_tenant_limits(tenant_id)
+    frappe.db.commit()
+
+
+def delete_document(doctype, name):
+    doc = frappe.get_doc(doctype, name)
+    if doc.docstatus == 1:
+        doc.flags.ignore_permissions = True
+        doc.cancel()
+    frappe.delete_doc(doctype, name, force=True, ignore_permissions=True)
+
+
+def count_rows(table_name, tenant_id):
+    return frappe.db.sql(
+        f"SELECT COUNT(*) FROM `{table_name}` WHERE tenant_id = %s", (tenant_id,))[0][0]
+
+
+def set_purge_progress(tenant, status, log):
+    """Persist the checkpoint and progress on the Tenant, committing the chunk"""
+    progress = 100 * log["deleted"] / log["total"] if log.get("total") else 0
+    frappe.db.set_value("Tenant", tenant, {
+        "purge_status": status,
+        "purge_progress": min(progress, 100),
+        "purge_log": json.dumps(log, indent=1),
+    }, update_modified=False)
+    frappe.db.commit()
+
+
+class Throttle:
+    """Sleeps between chunks and backs off while the replica lags or the primary is busy"""
+
+    def __init__(self):
+        conf = frappe.conf
+        self.chunk_sleep = float(conf.get("saas_purge_chunk_sleep", DEFAULT_CHUNK_SLEEP))
+        self.max_lag = conf.get("saas_purge_max_replication_lag", DEFAULT_MAX_REPLICATION_LAG)
+        self.max_running = conf.get("saas_purge_max_threads_running", DEFAULT_MAX_THREADS_RUNNING)
+        self.max_backoff = conf.get("saas_purge_max_backoff", DEFAULT_MAX_BACKOFF)
+        self.replica = None
+
+    def wait(self):
+        time.sleep(self.chunk_sleep)
+        waited = 0
+        while self.is_overloaded():
+            if waited >= self.max_backoff:
+                frappe.throw(
+                    f"Replica lagging / stopped or primary busy for over {waited}s, "
+                    "purge stopped - run Purge Data again to resume")
+            time.sleep(BACKOFF_SLEEP)
+            waited += BACKOFF_SLEEP
+
+    def is_overloaded(self):
+        threads_running = int(frappe.db.sql(
+            "SHOW GLOBAL STATUS LIKE 'Threads_running'")[0][1])
+        if threads_running > self.max_running:
+            return True
+
+        lag = self.get_replication_lag()
+        return lag is not None and lag > self.max_lag
+
+    def get_replication_lag(self):
+        """
+        Seconds_Behind_Master of the configured replica
+
+        Returns:
+                float: Lag, infinite for a stopped replica, None without replica_host
+
+        Raises:
+                ReplicationLagUnavailable if the lag cannot be read
+        """
+        conf = frappe.conf
+        if not conf.get("replica_host"):
+            return None
+
+        try:
+            if not self.replica:
+                if conf.get("different_credentials_for_replica"):
+                    user = conf.replica_db_user or conf.replica_db_name
+                    password = conf.replica_db_password
+                else:
+                    user = conf.db_user or conf.db_name
+                    password = conf.db_password
+                self.replica = get_db(
+                    host=conf.replica_host, port=conf.replica_db_port,
+                    user=user, password=password, cur_db_name=conf.db_name)
+
+            status = self.replica.sql("SHOW SLAVE STATUS", as_dict=True)
+        except Exception as e:
+            raise ReplicationLagUnavailable(
+                f"Could not read replication lag from {conf.replica_host} "
+                f"(the DB user needs REPLICATION CLIENT): {str(e)}")
+
+        if not status:
+            raise ReplicationLagUnavailable(
+                f"{conf.replica_host} reports no replication status, is it a replica?")
+
+        lag = status[0].Seconds_Behind_Master
+        # NULL while the replica's IO or SQL thread is stopped
+        return float("inf") if lag is None else lag
+
+    def close(self):
+        if self.replica:
+            self.replica.close()
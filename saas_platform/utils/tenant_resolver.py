@@ -0,0 +1,93 @@
+"""Shared User -> tenant_id resolution for permission and insert hooks"""
+import frappe
+
+from saas_platform.utils.outbox import emit_event
+
+CACHE_PREFIX = "saas_platform:user_tenant_id"
+DEFAULT_CACHE_TTL = 3600  # seconds
+
+
+def resolve_tenant_id(user=None):
+    """
+    Resolve the tenant_id a user belongs to.
+
+    Lookups go through a per-request memo first, then the shared Redis
+    cache, and only hit tabUser (single column) on a miss.
+
+    Args:
+            user: User email, defaults to the session user
+
+    Returns:
+            str: Tenant ID or None if the user has no tenant
+    """
+    user = user or frappe.session.user
+    memo = _get_request_memo()
+
+    if user in memo:
+        return memo[user] or None
+
+    cache_key = _get_cache_key(user)
+    tenant_id = frappe.cache().get_value(cache_key)
+
+    if tenant_id is None:
+        # Store "" for users without a tenant so misses are cached too
+        tenant_id = frappe.db.get_value("User", user, "tenant_id") or ""
+        frappe.cache().set_value(
+            cache_key, tenant_id, expires_in_sec=get_cache_ttl())
+
+    memo[user] = tenant_id
+    return tenant_id or None
+
+
+def clear_user_tenant_cache(user):
+    """
+    Drop the cached tenant_id of a user.
+
+    Clears immediately and again after commit, so a concurrent request
+    cannot repopulate the cache with the pre-commit value.
+
+    Args:
+            user: User email
+    """
+    _clear(user)
+    frappe.db.after_commit.add(lambda: _clear(user))
+
+
+def on_user_update(doc, method=None):
+    """doc_events hook: invalidate when a User's tenant_id changes"""
+    if not doc.has_value_changed("tenant_id"):
+        return
+
+    clear_user_tenant_cache(doc.name)
+
+    previous = doc.get_doc_before_save()
+    previous_tenant_id = previous.get("tenant_id") if previous else None
+    if doc.get("tenant_id") or previous_tenant_id:
+        emit_event("User Tenant Changed", doc.get("tenant_id"), user=doc.name,
+                   payload={"previous_tenant_id": previous_tenant_id})
+
+
+def on_user_trash(doc, method=None):
+    """doc_events hook: invalidate when a User is deleted"""
+    clear_user_tenant_cache(doc.name)
+
+
+def get_cache_ttl():
+    """Redis TTL for cached tenant_ids, overridable via site_config"""
+    return frappe.conf.get("saas_tenant_cache_ttl") or DEFAULT_CACHE_TTL
+
+
+def _clear(user):
+    frappe.cache().delete_value(_get_cache_key(user))
+    _get_request_memo().pop(user, None)
+
+
+def _get_cache_key(user):
+    return f"{CACHE_PREFIX}:{user}"
+
+
+def _get_request_memo():
+    # frappe.local is reset for every request / job
+    if not hasattr(frappe.local, "saas_user_tenant_ids"):
+        frappe.local.saas_user_tenant_ids = {}
+    return frappe.local.saas_user_tenant_ids
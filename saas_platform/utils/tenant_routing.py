@@ -0,0 +1,108 @@
+"""
+Host -> tenant_id resolution from a cached routing table
+
+Every request's Host header is mapped to a tenant before
+authentication, so Guest and website requests on a tenant's host are
+tenant-scoped too. The routing table (Tenant.site_name and
+`<subdomain>.<saas_base_domain>` -> tenant_id) is kept in process
+memory; each request only reads a version stamp from Redis, and any
+Tenant change that affects routing bumps the stamp so every worker
+rebuilds its table on the next request. Tenant sites with
+`saas_tenant_id` in their site_config resolve to it without a lookup.
+
+site_config keys:
+    saas_base_domain: domain tenant subdomains live under (default localhost)
+"""
+import frappe
+
+ROUTES_VERSION_KEY = "saas_platform:tenant_routes_version"
+DEFAULT_BASE_DOMAIN = "localhost"
+
+# site -> (version, {"hosts": {host: tenant_id}, "subdomains": {subdomain: tenant_id}})
+_routing_tables = {}
+
+
+def set_request_tenant():
+    """before_request hook: resolve the tenant of the request's host"""
+    frappe.local.saas_host_tenant_id = get_host_tenant_id()
+
+
+def get_request_tenant_id():
+    """Tenant ID of the current request's host, None outside requests or on other hosts"""
+    if not hasattr(frappe.local, "saas_host_tenant_id"):
+        frappe.local.saas_host_tenant_id = get_host_tenant_id()
+    return frappe.local.saas_host_tenant_id
+
+
+def get_host_tenant_id(host=None):
+    """
+    Resolve a host to a tenant_id through the routing table
+
+    Args:
+            host: Host name, defaults to the current request's Host header
+
+    Returns:
+            str: Tenant ID or None if the host belongs to no tenant
+    """
+    if frappe.conf.get("saas_tenant_id"):
+        return frappe.conf.saas_tenant_id
+
+    if host is None:
+        request = getattr(frappe.local, "request", None)
+        host = request.host if request else None
+    if not host:
+        return None
+
+    host = host.split(":")[0].lower()
+    table = get_routing_table()
+    tenant_id = table["hosts"].get(host)
+    if tenant_id is None:
+        base_domain = "." + (frappe.conf.get("saas_base_domain") or DEFAULT_BASE_DOMAIN)
+        if host.endswith(base_domain):
+            tenant_id = table["subdomains"].get(host[:-len(base_domain)])
+    return tenant_id
+
+
+def get_routing_table():
+    """This process's routing table, rebuilt when the version stamp changed"""
+    version = frappe.cache().get_value(ROUTES_VERSION_KEY)
+    if not version:
+        version = bump_routing_version()
+
+    cached = _routing_tables.get(frappe.local.site)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    table = build_routing_table()
+    _routing_tables[frappe.local.site] = (version, table)
+    return table
+
+
+def build_routing_table():
+    hosts, subdomains = {}, {}
+    for t in frappe.get_all(
+            "Tenant", fields=["tenant_id", "subdomain", "site_name"]):
+        if not t.tenant_id:
+            continue
+        if t.site_name:
+            hosts[t.site_name.lower()] = t.tenant_id
+        if t.subdomain:
+            subdomains[t.subdomain.lower()] = t.tenant_id
+    return {"hosts": hosts, "subdomains": subdomains}
+
+
+def bump_routing_version():
+    version = frappe.generate_hash(length=10)
+    frappe.cache().set_value(ROUTES_VERSION_KEY, version)
+    return version
+
+
+def invalidate_routing_table():
+    """
+    Make every worker rebuild its routing table
+
+    Bumps immediately and again after commit, so a worker rebuilding
+    concurrently cannot keep a table with the pre-commit rows.
+    """
+    bump_routing_version()
+    frappe.db.after_commit.add(bump_routing_version)
@@ -0,0 +1,223 @@
+"""
+Tenant snapshot stored in the session
+
+At login the session gets a compact snapshot of the user's tenant
+(tenant_id, status, plan, limits version) in `frappe.session.data`, which
+Frappe persists with the session, so later requests read it instead of
+looking the tenant up: get_tenant_id, the status gate and the plan
+limits (memoised per limits version) all use it. When a tenant's status
+or plan changes a background job rewrites the snapshots of its users'
+sessions; suspended or deleted tenants have their sessions revoked
+right after commit.
+"""
+import frappe
+from frappe.utils import cstr
+
+from saas_platform.utils.tenant_resolver import resolve_tenant_id
+
+SNAPSHOT_KEY = "tenant"
+REVOKED_STATUSES = ("Suspended", "Deleted")
+DEFAULT_PLAN = "Free Plan"
+
+
+def build_snapshots(tenant_ids):
+    """
+    Session snapshots for many tenants with two queries
+
+    Returns:
+            dict: tenant_id -> {"tenant_id", "status", "plan", "limits_version"}
+    """
+    tenant_ids = list({t for t in tenant_ids if t and t != "SYSTEM"})
+    snapshots = {"SYSTEM": frappe._dict(
+        tenant_id="SYSTEM", status=None, plan=None, limits_version=None)}
+    if not tenant_ids:
+        return snapshots
+
+    tenants = frappe.get_all(
+        "Tenant", filters={"tenant_id": ["in", tenant_ids]},
+        fields=["tenant_id", "status", "plan"])
+    default_plan = frappe.conf.get("saas_default_plan") or DEFAULT_PLAN
+    plans = {t.plan or default_plan for t in tenants}
+    versions = dict(frappe.get_all(
+        "Plan", filters={"name": ["in", list(plans)]},
+        fields=["name", "modified"], as_list=True))
+
+    for t in tenants:
+        plan = t.plan or default_plan
+        snapshots[t.tenant_id] = frappe._dict(
+            tenant_id=t.tenant_id,
+            status=t.status,
+            plan=plan,
+            # Changes whenever the plan's limits are edited
+            limits_version=cstr(versions.get(plan)),
+        )
+    return snapshots
+
+
+def set_session_snapshot(user, tenant_id=None):
+    """
+    on_session_creation: store the tenant snapshot in the new session
+
+    Reads only User.tenant_id (through the resolver cache) and the
+    Tenant row, then persists the session data.
+    """
+    tenant_id = tenant_id or resolve_tenant_id(user)
+    if not tenant_id:
+        return None
+
+    snapshot = build_snapshots([tenant_id]).get(tenant_id)
+    if not snapshot:
+        return None
+
+    frappe.session.data[SNAPSHOT_KEY] = snapshot
+    save_session(frappe.session.sid, frappe.session)
+    return snapshot
+
+
+def get_session_snapshot():
+    """Tenant snapshot of the current session, None if there is none"""
+    data = getattr(frappe.session, "data", None)
+    return data.get(SNAPSHOT_KEY) if data else None
+
+
+def on_tenant_change(tenant_ids, status=None):
+    """
+    After commit, revoke the sessions of suspended / deleted tenants'
+    users right away, or refresh them in a background job
+
+    Args:
+            tenant_ids: Tenant IDs whose status or plan changed
+            status: New status if known (skips a lookup for bulk changes)
+    """
+    tenant_ids = [t for t in tenant_ids if t]
+    if not tenant_ids:
+        return
+
+    if status in REVOKED_STATUSES:
+        # One DELETE, and the gate must not wait for a job
+        frappe.db.after_commit.add(lambda: revoke_tenant_sessions(tenant_ids))
+    else:
+        frappe.enqueue(
+            "saas_platform.utils.tenant_session.refresh_tenant_sessions",
+            enqueue_after_commit=True, tenant_ids=tenant_ids)
+
+
+def on_plan_update(doc, method=None):
+    """Plan limits changed: refresh the limits version of its tenants' sessions"""
+    frappe.enqueue(
+        "saas_platform.utils.tenant_session.refresh_plan_sessions",
+        job_id=f"saas_refresh_plan_sessions_{doc.name}", deduplicate=True,
+        enqueue_after_commit=True, plan=doc.name)
+
+
+def refresh_plan_sessions(plan):
+    """Background job: refresh the sessions of every tenant on a plan"""
+    tenant_ids = frappe.get_all("Tenant", filters={"plan": plan}, pluck="tenant_id")
+    if plan == (frappe.conf.get("saas_default_plan") or DEFAULT_PLAN):
+        tenant_ids += frappe.get_all(
+            "Tenant", filters={"plan": ["is", "not set"]}, pluck="tenant_id")
+    if tenant_ids:
+        refresh_tenant_sessions(tenant_ids)
+
+
+def on_user_update(doc, method=None):
+    """doc_events hook: a user moved tenants, refresh their sessions"""
+    if doc.has_value_changed("tenant_id"):
+        frappe.db.after_commit.add(lambda: refresh_user_sessions([doc.name]))
+
+
+def refresh_tenant_sessions(tenant_ids):
+    """Background job: rewrite the snapshot in every active session of the tenants' users"""
+    sessions = get_tenant_sessions(tenant_ids)
+    if not sessions:
+        return
+
+    snapshots = build_snapshots(tenant_ids)
+    revoke = []
+    for sid, tenant_id in sessions:
+        snapshot = snapshots.get(tenant_id)
+        if not snapshot or snapshot.status in REVOKED_STATUSES:
+            revoke.append(sid)
+        else:
+            update_session_snapshot(sid, snapshot)
+
+    delete_sessions(revoke)
+    frappe.db.commit()
+
+
+def refresh_user_sessions(users):
+    """Rewrite the snapshot in every active session of the users"""
+    sessions = frappe.db.sql("""
+        SELECT sid, user FROM `tabSessions` WHERE user IN %s
+    """, (tuple(users),))
+    if not sessions:
+        return
+
+    tenant_ids = {user: resolve_tenant_id(user) for _, user in sessions}
+    snapshots = build_snapshots(tenant_ids.values())
+    for sid, user in sessions:
+        snapshot = snapshots.get(tenant_ids[user])
+        if snapshot:
+            update_session_snapshot(sid, snapshot)
+    frappe.db.commit()
+
+
+def revoke_tenant_sessions(tenant_ids):
+    """Log out every user of the tenants"""
+    delete_sessions([sid for sid, _ in get_tenant_sessions(tenant_ids)])
+    frappe.db.commit()
+
+
+def get_tenant_sessions(tenant_ids):
+    """
+    Returns:
+            list: (sid, tenant_id) of active sessions of the tenants' users
+    """
+    return frappe.db.sql("""
+        SELECT s.sid, u.tenant_id
+        FROM `tabSessions` s
+        JOIN `tabUser` u ON u.name = s.user
+        WHERE u.tenant_id IN %s
+    """, (tuple(tenant_ids),))
+
+
+def update_session_snapshot(sid, snapshot):
+    session = frappe.cache().hget("session", sid)
+    if session:
+        session = frappe._dict(session)
+        session.data = frappe._dict(session.get("data") or {})
+    else:
+        # Not cached, Frappe reloads it from tabSessions
+        row = frappe.db.sql("SELECT sessiondata FROM `tabSessions` WHERE sid = %s", (sid,))
+        if not row:
+            return
+        session = frappe._dict(data=frappe._dict(frappe.safe_eval(row[0][0] or "{}")))
+
+    session.data[SNAPSHOT_KEY] = snapshot
+    save_session(sid, session)
+
+
+def save_session(sid, session):
+    """Persist session data to tabSessions and, if it has one, the session cache"""
+    if not sid or sid == "Guest":
+        return
+    frappe.db.sql("""
+        UPDATE `tabSessions` SET sessiondata = %s WHERE sid = %s
+    """, (str(session["data"]), sid))
+    if session.get("user"):
+        frappe.cache().hset("session", sid, session)
+
+
+def delete_sessions(sids):
+    """Delete sessions from the cache and tabSessions"""
+    if not sids:
+        return
+    for sid in sids:
+        frappe.cache().hdel("session", sid)
+    frappe.db.sql("DELETE FROM `tabSessions` WHERE sid IN %s", (tuple(sids),))
+
+
+def delete_user_sessions(users):
+    """Log out the given users everywhere"""
+    delete_sessions(frappe.db.sql_list(
+        "SELECT sid FROM `tabSessions` WHERE user IN %s", (tuple(users),)))
@@ -0,0 +1,109 @@
+"""
+Cached tenant_id -> status map and the request status gate
+
+Every request of a tenant user reads its tenant's status from the
+session's tenant snapshot, or else from a Redis hash (one HGET, filled
+lazily from the Tenant table), and is rejected with HTTP 403 while the
+tenant is Suspended or Deleted. Suspending or
+reactivating a tenant writes the new status into the map once the
+transaction commits, so it takes effect on the next request without
+touching the tenant's site.
+"""
+import frappe
+from frappe import _
+
+from saas_platform.utils.tenant import get_tenant_id
+from saas_platform.utils.tenant_session import get_session_snapshot
+
+STATUS_CACHE_KEY = "saas_platform:tenant_status"
+BLOCKED_STATUSES = ("Suspended", "Deleted")
+
+# Still reachable by users of a blocked tenant
+ALLOWED_PATHS = ("/api/method/logout",)
+
+
+class TenantSuspendedError(frappe.PermissionError):
+    pass
+
+
+def get_tenant_status(tenant_id):
+    """
+    Status of a tenant from the cached map
+
+    Args:
+            tenant_id: Tenant ID
+
+    Returns:
+            str: Tenant status, None for SYSTEM or unknown tenants
+    """
+    if not tenant_id or tenant_id == "SYSTEM":
+        return None
+
+    status = frappe.cache().hget(STATUS_CACHE_KEY, tenant_id)
+    if status is None:
+        # "" caches unknown tenant_ids too
+        status = frappe.db.get_value("Tenant", {"tenant_id": tenant_id}, "status") or ""
+        frappe.cache().hset(STATUS_CACHE_KEY, tenant_id, status)
+    return status or None
+
+
+def set_tenant_status(tenant_ids, status):
+    """
+    Write the tenants' new status into the map once the transaction commits
+
+    Args:
+            tenant_ids: Tenant IDs
+            status: New status, None to drop the entries (e.g. deleted Tenant)
+    """
+    tenant_ids = [t for t in tenant_ids if t]
+    if not tenant_ids:
+        return
+
+    def update():
+        cache = frappe.cache()
+        for tenant_id in tenant_ids:
+            if status:
+                cache.hset(STATUS_CACHE_KEY, tenant_id, status)
+            else:
+                cache.hdel(STATUS_CACHE_KEY, tenant_id)
+
+    frappe.db.after_commit.add(update)
+
+
+def clear_tenant_status():
+    """Drop the whole map, it is rebuilt on demand"""
+    frappe.cache().delete_key(STATUS_CACHE_KEY)
+
+
+def enforce_tenant_status():
+    """
+    before_request / auth hook: reject requests of suspended or deleted tenants
+
+    Registered for both so token / API key requests (authenticated after
+    before_request) are covered too; runs at most once per request.
+    """
+    if getattr(frappe.local, "saas_status_checked", False):
+        return
+
+    user = frappe.session.user
+    if user in ("Guest", "Administrator"):
+        return
+
+    request = getattr(frappe.local, "request", None)
+    if request and request.path in ALLOWED_PATHS:
+        return
+
+    frappe.local.saas_status_checked = True
+
+    # Sessions of suspended tenants are revoked, so the snapshot's status
+    # is current; the map covers sessions without one
+    snapshot = get_session_snapshot()
+    if snapshot and snapshot.get("status"):
+        status = snapshot["status"]
+    else:
+        status = get_tenant_status(get_tenant_id())
+
+    if status in BLOCKED_STATUSES:
+        frappe.throw(
+            _("Your organization's account is suspended. Please contact support."),
+            TenantSuspendedError)
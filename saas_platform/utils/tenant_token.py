@@ -0,0 +1,216 @@
+"""
+Signed tenant context tokens
+
+Short-lived EdDSA (Ed25519) JWTs carrying the user, tenant_id and tenant
+status. Microservices verify them locally against the published public
+keys instead of calling back to the Central Site on every request.
+
+The signing key is created once at install / migrate (never lazily by
+concurrent workers). `rotate_signing_key` starts signing with a new key
+while the JWKS keeps publishing the previous one until tokens signed
+with it have expired.
+
+Usage:
+    bench --site dev.localhost execute saas_platform.utils.tenant_token.rotate_signing_key
+"""
+import base64
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import frappe
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from frappe.installer import update_site_config
+from frappe.sessions import get_expiry_in_seconds
+from frappe.utils import get_url, now, time_diff_in_seconds
+
+from saas_platform.utils.tenant_resolver import resolve_tenant_id
+
+PRIVATE_KEY_CONFIG = "saas_tenant_token_private_key"
+PREVIOUS_KEY_CONFIG = "saas_tenant_token_previous_key"
+TOKEN_COOKIE = "tenant_token"
+ALGORITHM = "EdDSA"
+DEFAULT_TTL = 900  # seconds
+
+
+def issue_token(user, tenant_id=None, tenant_status=None):
+    """
+    Issue a signed tenant context token
+
+    Args:
+            user: User email
+            tenant_id: Tenant ID, resolved from the user if not passed
+            tenant_status: Tenant status, looked up if not passed
+
+    Returns:
+            str: Encoded JWT
+    """
+    tenant_id = tenant_id or resolve_tenant_id(user)
+    if tenant_status is None and tenant_id:
+        tenant_status = get_tenant_statuses([tenant_id]).get(tenant_id)
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "iss": get_url(),
+        "sub": user,
+        "tenant_id": tenant_id,
+        "tenant_status": tenant_status,
+        "iat": now,
+        "exp": now + timedelta(seconds=get_token_ttl()),
+    }
+    private_key = get_private_key()
+    return jwt.encode(payload, private_key, algorithm=ALGORITHM,
+                      headers={"kid": get_key_id(private_key.public_key())})
+
+
+def set_token_cookie(user, tenant_id=None):
+    """Issue a token and hand it to the browser alongside the session cookie"""
+    if not getattr(frappe.local, "cookie_manager", None):
+        return
+
+    # Like sid: not readable by page scripts, HTTPS-only when served over HTTPS
+    request = getattr(frappe.local, "request", None)
+    frappe.local.cookie_manager.set_cookie(
+        TOKEN_COOKIE, issue_token(user, tenant_id), max_age=get_token_ttl(),
+        httponly=True, secure=bool(request and request.scheme == "https"))
+
+
+def get_public_jwks():
+    """Current and previous public signing keys as a JWKS document"""
+    keys = [get_private_key()]
+    if frappe.conf.get(PREVIOUS_KEY_CONFIG):
+        keys.append(load_private_key(frappe.conf.get(PREVIOUS_KEY_CONFIG)))
+
+    jwks = []
+    for private_key in keys:
+        public_key = private_key.public_key()
+        raw = public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        jwks.append({
+            "kty": "OKP",
+            "crv": "Ed25519",
+            "alg": ALGORITHM,
+            "use": "sig",
+            "kid": get_key_id(public_key),
+            "x": base64.urlsafe_b64encode(raw).rstrip(b"=").decode(),
+        })
+    return {"keys": jwks}
+
+
+def resolve_sessions(sids):
+    """
+    Resolve many session IDs to user, tenant_id and tenant status at once
+
+    Args:
+            sids: List of session IDs
+
+    Returns:
+            dict: sid -> {"user", "tenant_id", "tenant_status"}, None if invalid
+    """
+    users = {}
+    missing = []
+    for sid in sids:
+        data = frappe.cache().hget("session", sid)
+        if not (data and data.get("user")):
+            missing.append(sid)
+        elif not is_session_expired(data.get("data") or {}):
+            users[sid] = data["user"]
+
+    if missing:
+        for sid, user in frappe.db.sql("""
+            SELECT sid, user FROM `tabSessions`
+            WHERE sid IN %s
+                AND TIMESTAMPDIFF(SECOND, lastupdate, NOW()) < %s
+        """, (tuple(missing), get_expiry_in_seconds())):
+            users[sid] = user
+
+    tenant_ids = {user: resolve_tenant_id(user) for user in set(users.values())}
+    statuses = get_tenant_statuses([t for t in tenant_ids.values() if t])
+
+    result = {}
+    for sid in sids:
+        user = users.get(sid)
+        if not user or user == "Guest":
+            result[sid] = None
+            continue
+        tenant_id = tenant_ids[user]
+        result[sid] = {
+            "user": user,
+            "tenant_id": tenant_id,
+            "tenant_status": statuses.get(tenant_id),
+        }
+
+    return result
+
+
+def is_session_expired(session_data):
+    """Same check Frappe applies to cached sessions"""
+    last_updated = session_data.get("last_updated")
+    if not last_updated:
+        return True
+    return time_diff_in_seconds(now(), last_updated) > get_expiry_in_seconds(
+        session_data.get("session_expiry"))
+
+
+def get_tenant_statuses(tenant_ids):
+    """
+    Returns:
+            dict: tenant_id -> Tenant status
+    """
+    if not tenant_ids:
+        return {}
+
+    return dict(frappe.get_all(
+        "Tenant", filters={"tenant_id": ["in", list(set(tenant_ids))]},
+        fields=["tenant_id", "status"], as_list=True))
+
+
+def get_token_ttl():
+    return int(frappe.conf.get("saas_tenant_token_ttl") or DEFAULT_TTL)
+
+
+def get_private_key():
+    """Current signing key from site_config"""
+    pem = frappe.conf.get(PRIVATE_KEY_CONFIG)
+    if not pem:
+        frappe.throw(
+            "Tenant token signing key is missing, run `bench migrate` to create it")
+    return load_private_key(pem)
+
+
+def load_private_key(pem):
+    return serialization.load_pem_private_key(pem.encode(), password=None)
+
+
+def ensure_signing_key():
+    """after_install / patch: create the signing key if the site has none"""
+    if not frappe.conf.get(PRIVATE_KEY_CONFIG):
+        set_config(PRIVATE_KEY_CONFIG, generate_private_key())
+
+
+def rotate_signing_key():
+    """Sign with a new key, keep publishing the current one as previous"""
+    ensure_signing_key()
+    set_config(PREVIOUS_KEY_CONFIG, frappe.conf.get(PRIVATE_KEY_CONFIG))
+    set_config(PRIVATE_KEY_CONFIG, generate_private_key())
+    print("✅ Tenant token signing key rotated, the previous key stays in the JWKS")
+
+
+def generate_private_key():
+    return Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def set_config(key, value):
+    update_site_config(key, value)
+    frappe.local.conf[key] = value
+
+
+def get_key_id(public_key):
+    raw = public_key.public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return hashlib.sha256(raw).hexdigest()[:16]
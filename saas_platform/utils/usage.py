@@ -0,0 +1,306 @@
+"""
+Incrementally maintained per-tenant usage counters
+
+Document inserts and deletes adjust per-request deltas (tenant_id,
+DocType) -> (documents, file bytes). Once the transaction commits the
+deltas are added to a Redis buffer with one pipeline, and a scheduler
+job flushes the buffer into `Tenant Usage` with a single upsert. A daily
+job recounts everything from the tables, correcting drift from raw SQL
+writes (bulk_insert, purges) that bypass doc_events.
+
+Reading a tenant's usage is then a lookup of its Tenant Usage rows
+instead of COUNT(*) over every table.
+"""
+import time
+from collections import defaultdict
+
+import frappe
+from frappe.utils import now
+
+from saas_platform.saas_platform.doctype.tenant_usage.tenant_usage import get_usage_name
+from saas_platform.utils.tenant_migration import get_table_plan
+from saas_platform.utils.tenant_resolver import resolve_tenant_id
+
+USAGE_DOCTYPE = "Tenant Usage"
+BUFFER_KEY = "saas_platform:usage_buffer"
+
+# Platform records that carry a tenant_id but are not tenant usage
+UNCOUNTED_DOCTYPES = frozenset([
+    "Tenant", "Tenant Change Event", "Tenant Usage", "Tenant Notification Log",
+])
+
+
+def on_insert(doc, method=None):
+    """doc_events hook: count a new document once its transaction commits"""
+    track(doc, 1)
+
+
+def on_trash(doc, method=None):
+    """doc_events hook: uncount a deleted document once its transaction commits"""
+    track(doc, -1)
+
+
+def track(doc, sign):
+    if doc.doctype in UNCOUNTED_DOCTYPES:
+        return
+
+    tenant_id = get_doc_tenant_id(doc)
+    if not tenant_id or tenant_id == "SYSTEM":
+        return
+
+    deltas = getattr(frappe.local, "saas_usage_deltas", None)
+    if deltas is None:
+        deltas = frappe.local.saas_usage_deltas = defaultdict(lambda: [0, 0])
+        frappe.db.after_commit.add(push_deltas)
+        frappe.db.after_rollback.add(discard_deltas)
+
+    entry = deltas[(tenant_id, doc.doctype)]
+    entry[0] += sign
+    if doc.doctype == "File":
+        entry[1] += sign * (doc.get("file_size") or 0)
+
+
+def get_doc_tenant_id(doc):
+    # Files are not stamped with a tenant_id, attribute them to the uploader
+    if doc.doctype == "File":
+        return resolve_tenant_id(doc.owner)
+    return doc.get("tenant_id")
+
+
+def push_deltas():
+    """after_commit: add this transaction's deltas to the Redis buffer"""
+    deltas = frappe.local.saas_usage_deltas
+    frappe.local.saas_usage_deltas = None
+    if deltas:
+        add_to_buffer(BUFFER_KEY, deltas)
+
+
+def discard_deltas():
+    frappe.local.saas_usage_deltas = None
+
+
+def add_to_buffer(key, deltas):
+    cache = frappe.cache()
+    pipe = cache.pipeline(transaction=False)
+    for (tenant_id, doctype), (count, size) in deltas.items():
+        field = f"{tenant_id}|{doctype}"
+        if count:
+            pipe.hincrby(cache.make_key(key), f"{field}|count", count)
+        if size:
+            pipe.hincrby(cache.make_key(key), f"{field}|size", size)
+    pipe.execute()
+
+
+def flush_usage_buffer():
+    """Scheduler job: apply buffered increments to Tenant Usage in one upsert"""
+    cache = frappe.cache()
+    buffer_key = cache.make_key(BUFFER_KEY)
+    flushing_key = cache.make_key(f"{BUFFER_KEY}:flushing:{time.time()}")
+
+    # RENAME is atomic: increments pushed from now on go to a new buffer
+    try:
+        cache.rename(buffer_key, flushing_key)
+    except Exception:
+        return  # nothing buffered
+
+    deltas = pop_buffer(flushing_key)
+    try:
+        upsert_usage(deltas, increment=True)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        add_to_buffer(BUFFER_KEY, deltas)  # retried on the next run
+        raise
+
+
+def pop_buffer(key):
+    """
+    Read and delete a renamed buffer
+
+    Returns:
+            dict: (tenant_id, doctype) -> [documents, file bytes]
+    """
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.hgetall(key)
+    pipe.delete(key)
+    buffered = pipe.execute()[0]
+
+    deltas = defaultdict(lambda: [0, 0])
+    for field, value in buffered.items():
+        tenant_id, doctype, metric = field.decode().rsplit("|", 2)
+        deltas[(tenant_id, doctype)][0 if metric == "count" else 1] += int(value)
+    return deltas
+
+
+def upsert_usage(usage, increment):
+    """
+    Write many Tenant Usage rows with one statement
+
+    Args:
+            usage: (tenant_id, doctype) -> [documents, file bytes]
+            increment: Add to the stored values instead of replacing them
+    """
+    if not usage:
+        return
+
+    timestamp = now()
+    values = [
+        (get_usage_name(tenant_id, doctype), tenant_id, doctype, count, size,
+         timestamp, timestamp, "Administrator", "Administrator")
+        for (tenant_id, doctype), (count, size) in usage.items()
+    ]
+    if increment:
+        update = """document_count = GREATEST(document_count + VALUES(document_count), 0),
+            file_size = GREATEST(file_size + VALUES(file_size), 0)"""
+    else:
+        update = """document_count = VALUES(document_count),
+            file_size = VALUES(file_size)"""
+
+    frappe.db.sql(f"""
+        INSERT INTO `tab{USAGE_DOCTYPE}`
+            (name, tenant_id, ref_doctype, document_count, file_size,
+             creation, modified, owner, modified_by)
+        VALUES {", ".join(["%s"] * len(values))}
+        ON DUPLICATE KEY UPDATE {update}, modified = VALUES(modified)
+    """, values)
+
+
+def reconcile_usage():
+    """
+    Scheduler job: recount every tenant's documents and file storage
+
+    Each DocType is recounted with the buffer set aside (see recount), so
+    deltas pushed while the job runs are neither counted twice nor lost.
+    """
+    flush_usage_buffer()
+
+    # Count what track() counts: child rows never fire after_insert / on_trash
+    child_doctypes = set(frappe.get_all("DocType", filters={"istable": 1}, pluck="name"))
+    tables = [
+        t.table_name for t in get_table_plan()
+        if t.has_column and t.table_name[3:] not in UNCOUNTED_DOCTYPES
+        and t.table_name[3:] not in child_doctypes
+        and t.table_name != "tabFile"
+    ]
+    if child_doctypes:
+        # Left by earlier reconciles that counted child tables
+        frappe.db.delete(USAGE_DOCTYPE, {"ref_doctype": ["in", list(child_doctypes)]})
+    for table_name in tables:
+        recount(table_name[3:], lambda: {
+            (tenant_id, table_name[3:]): [count, 0]
+            for tenant_id, count in frappe.db.sql(f"""
+                SELECT tenant_id, COUNT(*) FROM `{table_name}`
+                WHERE tenant_id NOT IN ('', 'SYSTEM')
+                GROUP BY tenant_id
+            """)
+        })
+
+    # Files are not stamped, they are counted for their uploader's tenant
+    recount("File", lambda: {
+        (tenant_id, "File"): [count, int(size or 0)]
+        for tenant_id, count, size in frappe.db.sql("""
+            SELECT u.tenant_id, COUNT(*), SUM(f.file_size)
+            FROM `tabFile` f
+            JOIN `tabUser` u ON u.name = f.owner
+            WHERE u.tenant_id IS NOT NULL AND u.tenant_id NOT IN ('', 'SYSTEM')
+            GROUP BY u.tenant_id
+        """)
+    })
+
+
+def recount(doctype, count):
+    """
+    Replace one DocType's usage with count() without double counting
+
+    The buffer is renamed away right before counting: deltas pushed before
+    that are already in the count and are dropped for this DocType, later
+    ones go to the new buffer and are flushed on top of the count. Deltas
+    of other DocTypes are put back.
+
+    Args:
+            doctype: DocType recounted
+            count: Callable returning (tenant_id, doctype) -> [documents, file bytes]
+    """
+    cache = frappe.cache()
+    snapshot_key = cache.make_key(f"{BUFFER_KEY}:reconciling:{time.time()}")
+    try:
+        cache.rename(cache.make_key(BUFFER_KEY), snapshot_key)
+    except Exception:
+        snapshot_key = None  # nothing buffered
+
+    replaced = False
+    try:
+        replace_usage(doctype, count())
+        replaced = True
+    finally:
+        if snapshot_key:
+            deltas = pop_buffer(snapshot_key)
+            if replaced:
+                deltas = {key: value for key, value in deltas.items() if key[1] != doctype}
+            if deltas:
+                add_to_buffer(BUFFER_KEY, deltas)
+
+
+def replace_usage(doctype, usage):
+    """Set exact usage for one DocType and zero tenants that have none left"""
+    upsert_usage(usage, increment=False)
+
+    tenant_ids = [tenant_id for tenant_id, _ in usage]
+    frappe.db.sql(f"""
+        UPDATE `tab{USAGE_DOCTYPE}`
+        SET document_count = 0, file_size = 0
+        WHERE ref_doctype = %(doctype)s
+            {"AND tenant_id NOT IN %(tenant_ids)s" if tenant_ids else ""}
+    """, {"doctype": doctype, "tenant_ids": tuple(tenant_ids)})
+    frappe.db.commit()
+
+
+def get_document_usage(tenant_id, doctype):
+    """
+    Usage of one DocType including increments not flushed yet
+
+    One primary key read plus one Redis round trip - used by the plan
+    limit check on insert.
+
+    Returns:
+            dict: {"document_count", "file_size"}
+    """
+    usage = frappe.db.get_value(
+        USAGE_DOCTYPE, get_usage_name(tenant_id, doctype),
+        ["document_count", "file_size"], as_dict=True) or frappe._dict(
+        document_count=0, file_size=0)
+
+    cache = frappe.cache()
+    field = f"{tenant_id}|{doctype}"
+    pipe = cache.pipeline(transaction=False)
+    pipe.hmget(cache.make_key(BUFFER_KEY), f"{field}|count", f"{field}|size")
+    buffered_count, buffered_size = pipe.execute()[0]
+
+    pending = (getattr(frappe.local, "saas_usage_deltas", None) or {}).get(
+        (tenant_id, doctype), (0, 0))
+
+    return {
+        "document_count": (usage.document_count or 0) + int(buffered_count or 0) + pending[0],
+        "file_size": (usage.file_size or 0) + int(buffered_size or 0) + pending[1],
+    }
+
+
+def get_tenant_usage(tenant_id):
+    """
+    Current usage of a tenant
+
+    Returns:
+            dict: {"users", "documents", "file_size", "by_doctype": {doctype: count}}
+    """
+    rows = frappe.get_all(
+        USAGE_DOCTYPE, filters={"tenant_id": tenant_id, "document_count": [">", 0]},
+        fields=["ref_doctype", "document_count", "file_size"])
+
+    by_doctype = {row.ref_doctype: row.document_count for row in rows}
+    return {
+        "users": by_doctype.get("User", 0),
+        "documents": sum(by_doctype.values()),
+        "file_size": sum(row.file_size or 0 for row in rows),
+        "by_doctype": by_doctype,
+    }
@@ -0,0 +1,47 @@
+"""Bounded thread pools with a Frappe site connection per worker"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import frappe
+
+
+def map_in_site_threads(fn, items, max_workers, site=None):
+    """
+    Run fn(item) for every item on a bounded thread pool.
+
+    Each call gets its own frappe.init/connect on the site, since
+    frappe.local (and with it frappe.db) is per thread. Results are
+    yielded as they complete so callers can checkpoint progress.
+
+    Args:
+            fn: Callable taking one item
+            items: Iterable of items, submitted in order
+            max_workers: Pool size
+            site: Site name, defaults to the current site
+
+    Yields:
+            tuple: (item, result, error) - error is None on success
+    """
+    site = site or frappe.local.site
+    sites_path = frappe.local.sites_path
+
+    def run(item):
+        frappe.init(site=site, sites_path=sites_path)
+        frappe.connect()
+        try:
+            result = fn(item)
+            frappe.db.commit()
+            return result
+        except Exception:
+            frappe.db.rollback()
+            raise
+        finally:
+            frappe.destroy()
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = {pool.submit(run, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e